@@ -0,0 +1,85 @@
+import argparse
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+from src.batch import duplicate_names, find_pdfs, run_batch
+from src.journal import Journal
+from src.rendering import BACKENDS, set_backend
+from src.template import RENDER_MODES, load_template
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the rects of a template from many PDFs without the GUI")
+    parser.add_argument("template", type=Path, help="Rects file saved from the app (*.rects)")
+    parser.add_argument("source", help="Folder containing PDFs or a glob pattern such as 'scans/**/*.pdf'")
+    parser.add_argument("output", type=Path, help="Output folder, one subfolder per PDF")
+    parser.add_argument(
+        "--restart", action="store_true", help="Extract every rect again, even if its PDF and geometry did not change"
+    )
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="PDF renderer, pdfium when it is installed")
+    parser.add_argument("--dpi", type=int, help="Render DPI of the crops, the template's or 200 when not given")
+    parser.add_argument("--mode", choices=RENDER_MODES, help="Colour mode of the crops, the template's or RGB")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not print one line per processed file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.backend is not None:
+        set_backend(args.backend)
+
+    template = load_template(args.template)
+    rects = template.rects
+    if not rects:
+        print(f"No rects found in {args.template}", file=sys.stderr)
+        return 1
+
+    def progress(path: Path, crops: int):
+        if not args.quiet:
+            print(f"{path}: {crops} rects extracted")
+
+    def failed(path: Path, error: Exception):
+        print(f"{path}: failed, {error}", file=sys.stderr)
+
+    # Rects already extracted from the same PDF and geometry by a previous, possibly interrupted, run are skipped
+    journal = Journal(args.output)
+    if args.restart:
+        journal.clear_extractions()
+
+    profile = template.profile("export")
+    if args.dpi is not None:
+        profile = replace(profile, dpi=args.dpi)
+    if args.mode is not None:
+        profile = replace(profile, mode=args.mode)
+
+    files = list(find_pdfs(args.source))
+    duplicates = duplicate_names(files)
+    if duplicates:
+        # Their crops would end up in the same output folder
+        print("PDFs in different folders share a name, rename them or extract them separately:", file=sys.stderr)
+        for same in duplicates.values():
+            print("  " + ", ".join(str(path) for path in same), file=sys.stderr)
+        return 1
+
+    file_count, crop_count, failures = run_batch(rects, files, args.output, progress, journal, failed, profile)
+    journal.close()
+    if file_count == 0 and not failures:
+        print(f"No PDFs found in {args.source}", file=sys.stderr)
+        return 1
+
+    print(
+        f"Successfully extracted {crop_count} rects from {file_count} files to {args.output.absolute()}, "
+        f"{file_count * len(rects) - crop_count} were up to date"
+    )
+    if failures:
+        print(f"{len(failures)} files could not be extracted:", file=sys.stderr)
+        for path in failures:
+            print(f"  {path}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from benchmarks.synthetic import field_rects, field_texts, write_pdf  # noqa: E402
+from src.pdf_index import read_info  # noqa: E402
+from src.rendering import BACKENDS, render_page, render_region, set_backend  # noqa: E402
+
+DPI = 144
+ROTATIONS = (0, 90, 180, 270)
+CROP_BOXES = (None, (10, 10, 585, 832))  # Points, the whole MediaBox or a CropBox inside it
+BOXES = [(40, 60, 400, 300), (500, 900, 1000, 1100), (0, 0, 1100, 1100)]  # Pixels at DPI, inside any page
+TOLERANCE = 2.0  # Mean absolute difference per pixel, anti-aliasing at the borders may differ slightly
+
+
+def check(path: Path) -> list[str]:
+    # A region render has to show exactly the same area as a full-page render cut to the same box
+    errors = []
+    page = np.asarray(render_page(path, 1, DPI, "L"), dtype=np.float32)
+    # Every backend draws the CropBox, the area page sizes and rect coordinates are given in
+    width, height = read_info(path).page_size(1, DPI)
+    if abs(page.shape[1] - width) > 1 or abs(page.shape[0] - height) > 1:
+        errors.append(f"page is {page.shape[1]}x{page.shape[0]}, expected {width}x{height}")
+    for box in BOXES:
+        left, top, right, bottom = box
+        try:
+            region = np.asarray(render_region(path, 1, box, DPI, "L"), dtype=np.float32)
+        except Exception as e:
+            errors.append(f"{box}: {e}")
+            continue
+        expected = page[top:bottom, left:right]
+        if region.shape != expected.shape:
+            errors.append(f"{box}: region is {region.shape}, expected {expected.shape}")
+        elif np.abs(region - expected).mean() > TOLERANCE:
+            errors.append(f"{box}: mean difference {np.abs(region - expected).mean():.1f}")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that region renders match full-page renders on rotated and cropped pages"
+    )
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    args = parser.parse_args(argv)
+
+    rects = field_rects(1, 22)
+    texts = field_texts(0, rects)
+    failed = False
+    with tempfile.TemporaryDirectory() as folder:
+        for name in args.backends:
+            try:
+                set_backend(name)
+            except ImportError as e:
+                print(f"{name}: unavailable: {e}")
+                continue
+            if name == "poppler" and shutil.which("pdftoppm") is None:
+                print(f"{name}: unavailable: pdftoppm is not in PATH")
+                continue
+
+            for crop_box in CROP_BOXES:
+                for rotate in ROTATIONS:
+                    path = Path(folder) / f"rotate_{rotate}.pdf"
+                    write_pdf(path, 1, rects, texts, rotate, crop_box)
+                    errors = check(path)
+                    failed = failed or bool(errors)
+                    label = f"/Rotate {rotate}" + (f" /CropBox {list(crop_box)}" if crop_box is not None else "")
+                    print(f"{name} {label}: {'ok' if not errors else 'FAILED'}")
+                    for error in errors:
+                        print(f"    {error}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from src.batch import crop_document  # noqa: E402
+from src.pdf_index import read_info  # noqa: E402
+from src.rendering import BACKENDS, set_backend, render_page  # noqa: E402
+from src.template import PickleRect, load_rects  # noqa: E402
+
+
+def default_rects(page_count: int) -> list[PickleRect]:
+    # A few small fields on the first pages, similar to a typical form template
+    return [
+        PickleRect(100 + 300 * (i % 4), 200 + 250 * (i // 4), 250, 80, f"field_{i}", 1 + i % min(page_count, 3))
+        for i in range(12)
+    ]
+
+
+def page_turn_latency(paths: list[Path], pages: int) -> list[float]:
+    latencies = []
+    for path in paths:
+        for number in range(1, min(pages, read_info(path).page_count) + 1):
+            start = time.perf_counter()
+            render_page(path, number)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def extraction_throughput(paths: list[Path], rects: list[PickleRect]) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        crop_document(path, rects)
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare page-turn latency and extraction throughput per backend")
+    parser.add_argument("pdfs", type=Path, nargs="+")
+    parser.add_argument("--template", type=Path, help="Rects file to extract, a generic one is used otherwise")
+    parser.add_argument("--pages", type=int, default=10, help="Pages rendered per PDF for the latency test")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    args = parser.parse_args(argv)
+
+    rects = load_rects(args.template) if args.template else default_rects(read_info(args.pdfs[0]).page_count)
+
+    print(f"{'backend':<10}{'median turn (ms)':>18}{'p95 turn (ms)':>16}{'extract (files/s)':>20}")
+    for name in args.backends:
+        try:
+            set_backend(name)
+        except ImportError as e:
+            print(f"{name:<10}unavailable: {e}")
+            continue
+
+        latencies = sorted(page_turn_latency(args.pdfs, args.pages))
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        throughput = extraction_throughput(args.pdfs, rects)
+        print(f"{name:<10}{statistics.median(latencies) * 1000:>18.1f}{p95 * 1000:>16.1f}{throughput:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import csv
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from benchmarks.synthetic import field_rects, generate_corpus  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ["load", "render", "crop", "extract", "ocr"]
+RESULTS_FOLDER = Path(__file__).absolute().parent / "results"
+
+
+def peak_rss_mb(who=None) -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench_load(paths: list[Path], config: dict) -> dict:
+    # What a PDFFile costs on an index miss: the page tree is read, nothing is rendered
+    from src.pdf_index import read_info
+
+    times = []
+    for path in paths:
+        start = time.perf_counter()
+        read_info(path)
+        times.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(times) * 1000, "p95_ms": percentile(times, 0.95) * 1000}
+
+
+def bench_render(paths: list[Path], config: dict) -> dict:
+    from src.rendering import EXPORT_PROFILE, OCR_PROFILE, PREVIEW_PROFILE, render_page
+
+    results = {}
+    for name, profile in (("preview", PREVIEW_PROFILE), ("ocr", OCR_PROFILE), ("export", EXPORT_PROFILE)):
+        times = []
+        for path in paths:
+            for number in range(1, config["pages"] + 1):
+                start = time.perf_counter()
+                render_page(path, number, profile.dpi, profile.mode)
+                times.append(time.perf_counter() - start)
+        results[f"{name}_median_ms"] = statistics.median(times) * 1000
+        results[f"{name}_p95_ms"] = percentile(times, 0.95) * 1000
+    return results
+
+
+def bench_crop(paths: list[Path], config: dict) -> dict:
+    # Only the cropping, the page regions of each file are rendered before the clock starts
+    from src.batch import crop_regions, render_regions
+
+    rects = field_rects(config["pages"], config["fields"])
+    elapsed = 0.0
+    for path in paths:
+        regions = list(render_regions(path, rects))
+        start = time.perf_counter()
+        crop_regions(regions, rects)
+        elapsed += time.perf_counter() - start
+    return {"crops_per_second": len(paths) * len(rects) / elapsed}
+
+
+def bench_extract(paths: list[Path], config: dict) -> dict:
+    from src.batch import run_batch
+
+    rects = field_rects(config["pages"], config["fields"])
+    with tempfile.TemporaryDirectory() as output_folder:
+        start = time.perf_counter()
+        run_batch(rects, iter(paths), Path(output_folder))
+        elapsed = time.perf_counter() - start
+    return {"files_per_second": len(paths) / elapsed}
+
+
+class BenchJob:
+    # Stands in for the app's job, nothing is ever cancelled and progress is not shown
+    def progress(self, stage: str, done: int, total: int):
+        pass
+
+    def on_cancel(self, callback):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+
+def bench_ocr(paths: list[Path], config: dict) -> dict:
+    # "Run OCR" end to end on freshly extracted crops: journal, empty OCR cache, engine and workbook
+    import pytesseract
+    from src.batch import run_batch
+    from src.journal import Journal
+    from src.ocr_cache import OCRCache
+    from src.ocr_workbook import folder_rows, ocr_to_workbook
+    from src.preprocessing import DEFAULT_OPTIONS
+    from src.results_writer import open_writer
+
+    if config["tesseract"]:
+        pytesseract.pytesseract.tesseract_cmd = config["tesseract"]
+    rects = field_rects(config["pages"], config["fields"])
+    expected = json.loads(Path(config["corpus"], "expected.json").read_text())
+
+    with tempfile.TemporaryDirectory() as folder:
+        output_folder = Path(folder, "output")
+        run_batch(rects, iter(paths), output_folder)
+
+        start = time.perf_counter()
+        journal = Journal(output_folder)
+        cache = OCRCache(Path(folder, "ocr_cache.sqlite3"))
+        writer = open_writer(Path(folder, "results.csv"))
+        header, rows = folder_rows(output_folder, True)
+        layout = [(name, [key for key, _ in row_cells]) for name, row_cells in rows]
+        cells = [cell for _, row_cells in rows for cell in row_cells]
+        # Preprocessing is on by default in the app
+        options = lambda name: DEFAULT_OPTIONS  # noqa: E731
+        try:
+            ocr_to_workbook(BenchJob(), writer, header, layout, cells, journal, cache, config["workers"], options)
+        finally:
+            writer.close()
+            journal.close()
+        elapsed = time.perf_counter() - start
+
+        with open(Path(folder, "results.csv"), newline="", encoding="utf-8-sig") as file:
+            table = list(csv.reader(file))
+
+    names = [Path(name).stem for name in table[0][1:]]
+    texts = {(row[0], name): text for row in table[1:] for name, text in zip(names, row[1:])}
+    found = [texts.get((path.name, rect.name), "") for path in paths for rect in rects]
+    wanted = [expected[path.name][rect.name] for path in paths for rect in rects]
+    correct = sum(text.strip() == want for text, want in zip(found, wanted))
+    return {
+        "files_per_second": len(paths) / elapsed,
+        "accuracy": correct / len(wanted),
+        "workers_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+    }
+
+
+BENCHMARKS = {
+    "load": bench_load,
+    "render": bench_render,
+    "crop": bench_crop,
+    "extract": bench_extract,
+    "ocr": bench_ocr,
+}
+
+
+def run_stage(stage: str, config: dict) -> dict:
+    # Runs inside its own process, so the peak RSS belongs to this stage alone
+    from src.rendering import get_backend, set_backend
+
+    if config["backend"]:
+        set_backend(config["backend"])
+    paths = sorted(Path(config["corpus"]).glob("*.pdf"))
+    result = BENCHMARKS[stage](paths, config)
+    result["backend"] = get_backend().name
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def compare(report: dict, baseline: dict):
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for stage, results in report["results"].items():
+        for metric, value in results.items():
+            old = baseline.get("results", {}).get(stage, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else ""
+            print(f"{stage + '.' + metric:<36}{old:>12.2f}{value:>12.2f}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark rendering, cropping, extraction and OCR on synthetic PDFs")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--files", type=int, default=20, help="Number of synthetic PDFs")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per PDF")
+    parser.add_argument("--fields", type=int, default=8, help="Text fields per page, at most 22")
+    parser.add_argument("--backend", help="Render backend, the default one when not given")
+    parser.add_argument("--workers", type=int, default=None, help="OCR worker processes, one per CPU by default")
+    parser.add_argument("--tesseract", help="Tesseract executable to use for the OCR stage")
+    parser.add_argument("--corpus", type=Path, help="Keep the generated PDFs in this folder instead of a temporary one")
+    parser.add_argument("--output", type=Path, help="Report file, benchmarks/results/<commit>.json by default")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare the results against")
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, json.loads(args.config))))
+        return
+
+    with tempfile.TemporaryDirectory() as temporary:
+        corpus = args.corpus or Path(temporary)
+        expected = generate_corpus(corpus, args.files, args.pages, args.fields)
+        (corpus / "expected.json").write_text(json.dumps(expected))
+        config = {
+            "corpus": str(corpus.absolute()),
+            "files": args.files,
+            "pages": args.pages,
+            "fields": args.fields,
+            "backend": args.backend,
+            "workers": args.workers,
+            "tesseract": args.tesseract,
+        }
+
+        results = {}
+        for stage in args.stages:
+            print(f"Running {stage}...", file=sys.stderr)
+            process = subprocess.run(
+                [sys.executable, __file__, "--stage", stage, "--config", json.dumps(config)],
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                # A missing tesseract or backend only skips its stage
+                error = process.stderr.strip().splitlines()
+                results[stage] = {"error": error[-1] if error else f"exit code {process.returncode}"}
+                continue
+            results[stage] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in config.items() if key != "corpus"},
+        "results": results,
+    }
+
+    output = args.output or RESULTS_FOLDER / f"{(commit or 'unknown')[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
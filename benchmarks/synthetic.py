@@ -0,0 +1,85 @@
+import random
+from pathlib import Path
+from typing import Optional
+
+from src.template import POINTS_DPI, PickleRect
+
+PAGE_WIDTH = 595  # A4, in points
+PAGE_HEIGHT = 842
+FONT_SIZE = 14
+FIELD_WIDTH = 220
+FIELD_HEIGHT = 30
+WORDS = [
+    "ALPHA", "BRAVO", "CHARLIE", "DELTA", "ECHO", "FOXTROT", "GOLF", "HOTEL", "INDIA", "JULIET",
+    "KILO", "LIMA", "MIKE", "OSCAR", "PAPA", "QUEBEC", "ROMEO", "SIERRA", "TANGO", "VICTOR",
+]
+
+
+def field_rects(pages: int, fields: int) -> list[PickleRect]:
+    # Two columns of fields down every page, the same layout on all pages
+    return [
+        PickleRect(
+            60 + 260 * (i % 2), 80 + 70 * (i // 2), FIELD_WIDTH, FIELD_HEIGHT, f"p{page}_f{i}", page, dpi=POINTS_DPI
+        )
+        for page in range(1, pages + 1)
+        for i in range(fields)
+    ]
+
+
+def field_texts(seed: int, rects: list[PickleRect]) -> dict[str, str]:
+    generator = random.Random(seed)
+    return {rect.name: f"{generator.choice(WORDS)} {generator.randrange(1000, 10000)}" for rect in rects}
+
+
+def write_pdf(
+    path: Path,
+    pages: int,
+    rects: list[PickleRect],
+    texts: dict[str, str],
+    rotate: int = 0,
+    crop_box: Optional[tuple[int, int, int, int]] = None,
+):
+    # A minimal PDF with real text drawn in the standard Helvetica font, so it has a text layer as well
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    crop = b" /CropBox [%d %d %d %d]" % crop_box if crop_box is not None else b""
+    for page in range(1, pages + 1):
+        lines = [f"BT /F1 {FONT_SIZE} Tf"]
+        for rect in rects:
+            if rect.page == page:
+                baseline = PAGE_HEIGHT - rect.y - (rect.height + FONT_SIZE * 0.7) / 2
+                lines.append(f"1 0 0 1 {rect.x + 6:.2f} {baseline:.2f} Tm ({texts[rect.name]}) Tj")
+        lines.append("ET")
+        content = "\n".join(lines).encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d]%s /Rotate %d /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, crop, rotate, len(objects))
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{number} 0 R" for number in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+
+
+def generate_corpus(folder: Path, files: int, pages: int, fields: int) -> dict[str, dict[str, str]]:
+    # Expected text of every field, per file name
+    folder.mkdir(parents=True, exist_ok=True)
+    rects = field_rects(pages, fields)
+    expected = {}
+    for seed in range(files):
+        path = folder / f"synthetic_{seed:04d}.pdf"
+        texts = field_texts(seed, rects)
+        write_pdf(path, pages, rects, texts)
+        expected[path.name] = texts
+    return expected
@@ -1,3 +1,4 @@
+import multiprocessing
 from pathlib import Path
 
 from PySide6.QtWidgets import QApplication
@@ -7,6 +8,7 @@ import pytesseract
 pytesseract.pytesseract.tesseract_cmd = Path('.') / "Tesseract" / "tesseract.exe"
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication()
     window = MainWindow()
     window.show()
@@ -0,0 +1,113 @@
+import glob
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from .crops import crop_array, encode_crops, page_array
+from .journal import Journal
+from .planner import PagePlan, plan_pages
+from .rendering import EXPORT_PROFILE, RenderProfile, render_region
+from .template import PickleRect
+
+
+def find_pdfs(source: str) -> Iterator[Path]:
+    path = Path(source)
+    if path.is_dir():
+        return iter(sorted(p for p in path.iterdir() if p.suffix.lower() == ".pdf"))
+    return iter(sorted(Path(p) for p in glob.iglob(source, recursive=True) if p.lower().endswith(".pdf")))
+
+
+def duplicate_names(paths: Iterable[Path]) -> dict[str, list[Path]]:
+    # Output folders and journal rows are keyed by file name, two PDFs with the same name would overwrite each other
+    found = defaultdict(list)
+    for path in paths:
+        found[path.name].append(path)
+    return {name: same for name, same in found.items() if len(same) > 1}
+
+
+def render_regions(
+    path: Path, rects: list[PickleRect], profile: RenderProfile = EXPORT_PROFILE
+) -> Iterator[tuple[PagePlan, np.ndarray]]:
+    # The area of each page covered by the rects, one page at a time
+    for plan in plan_pages(rects, profile.dpi):
+        yield plan, page_array(render_region(path, plan.page, plan.box, profile.dpi, profile.mode))
+
+
+def crop_regions(regions: Iterable[tuple[PagePlan, np.ndarray]], rects: list[PickleRect]) -> list[np.ndarray]:
+    crops: list[Optional[np.ndarray]] = [None] * len(rects)
+    indexes = {id(rect): i for i, rect in enumerate(rects)}
+    for plan, region in regions:
+        for rect in plan.rects:
+            crop = crop_array(region, plan.relative_box(rect))
+            # The crops outlive the render, a view would keep the whole page region in memory with them
+            crops[indexes[id(rect)]] = crop.copy() if crop.base is not None else crop
+    return crops
+
+
+def crop_document(
+    path: Path, rects: list[PickleRect], profile: RenderProfile = EXPORT_PROFILE
+) -> list[np.ndarray]:
+    return crop_regions(render_regions(path, rects, profile), rects)
+
+
+def save_crops(path: Path, rects: list[PickleRect], crops: list[np.ndarray], output_folder: Path):
+    file_folder_path = output_folder / path.name
+    file_folder_path.mkdir(parents=True, exist_ok=True)
+    encode_crops(crops, [file_folder_path / f"{rect.name}.png" for rect in rects])
+
+
+def extract_document(
+    path: Path,
+    rects: list[PickleRect],
+    output_folder: Path,
+    journal: Optional[Journal] = None,
+    profile: RenderProfile = EXPORT_PROFILE,
+) -> int:
+    # Crops whose PDF, rect geometry and render profile did not change since they were written are kept as they are
+    if journal is not None:
+        rects = journal.outdated(path, rects, output_folder, profile)
+    if not rects:
+        return 0
+
+    save_crops(path, rects, crop_document(path, rects, profile), output_folder)
+    if journal is not None:
+        journal.mark_extracted(path, rects, profile)
+    return len(rects)
+
+
+def run_batch(
+    rects: list[PickleRect],
+    files: Iterator[Path],
+    output_folder: Path,
+    progress: Optional[Callable[[Path, int], None]] = None,
+    journal: Optional[Journal] = None,
+    failed: Optional[Callable[[Path, Exception], None]] = None,
+    profile: RenderProfile = EXPORT_PROFILE,
+) -> tuple[int, int, list[Path]]:
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    file_count = 0
+    crop_count = 0
+    failures = []
+    names = set()
+    for path in files:
+        # One document at a time: the rendered pages are dropped before the next file is opened
+        try:
+            if path.name in names:
+                raise ValueError(f"Another PDF named {path.name} was already extracted to the same output folder")
+            names.add(path.name)
+            crops = extract_document(path, rects, output_folder, journal, profile)
+        except Exception as e:
+            # A broken PDF is reported and skipped, the rest of the batch still runs
+            failures.append(path)
+            if failed is not None:
+                failed(path, e)
+            continue
+        file_count += 1
+        crop_count += crops
+        if progress is not None:
+            progress(path, crops)
+
+    return file_count, crop_count, failures
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+ENCODE_THREADS = min(8, os.cpu_count() or 1)
+
+Box = tuple[int, int, int, int]
+
+
+def page_array(image: Image.Image) -> np.ndarray:
+    return np.asarray(image)
+
+
+def crop_array(array: np.ndarray, box: Box) -> np.ndarray:
+    left, top, right, bottom = box
+    height, width = array.shape[:2]
+    if 0 <= left and 0 <= top and right <= width and bottom <= height:
+        # Plain slicing, the crop shares its memory with the page
+        return array[top:bottom, left:right]
+
+    # Rects reaching outside the page are padded with black, like PIL's crop does
+    crop = np.zeros((bottom - top, right - left, *array.shape[2:]), dtype=array.dtype)
+    source_left, source_top = max(left, 0), max(top, 0)
+    source_right, source_bottom = min(right, width), min(bottom, height)
+    if source_left < source_right and source_top < source_bottom:
+        crop[source_top - top:source_bottom - top, source_left - left:source_right - left] = array[
+            source_top:source_bottom, source_left:source_right
+        ]
+    return crop
+
+
+def encode_crops(crops: list[np.ndarray], paths: list[Path]):
+    # PNG compression releases the GIL, so the crops of a page are encoded in parallel
+    def encode(crop: np.ndarray, path: Path):
+        Image.fromarray(crop).save(path)
+
+    with ThreadPoolExecutor(max_workers=ENCODE_THREADS) as executor:
+        for future in [executor.submit(encode, crop, path) for crop, path in zip(crops, paths)]:
+            future.result()
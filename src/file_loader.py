@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt
+
+from .pdf_index import get_pdf_index
+
+BATCH_INTERVAL = 0.1  # Seconds between list updates while scanning
+
+
+def iter_pdf_paths(folder: Path):
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield Path(root) / name
+
+
+class ScanSignals(QObject):
+    found = Signal(object)
+    finished = Signal(int, int)
+
+
+class FolderScanner(QRunnable):
+    def __init__(self, folder: Path):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.folder = folder
+        self.signals = ScanSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        batch = []
+        found = 0
+        failed = 0
+        last_emit = time.monotonic()
+        for path in iter_pdf_paths(self.folder):
+            if self._cancelled.is_set():
+                break
+
+            try:
+                batch.append((path, get_pdf_index().get(path)))
+                found += 1
+            except Exception:
+                failed += 1
+
+            if batch and time.monotonic() - last_emit > BATCH_INTERVAL:
+                self.signals.found.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+
+        if self._cancelled.is_set():
+            return
+        if batch:
+            self.signals.found.emit(batch)
+        self.signals.finished.emit(found, failed)
+
+
+class FileLoader(QObject):
+    found = Signal(object)
+    finished = Signal(int, int)
+
+    def __init__(self):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.scanner: FolderScanner = None
+
+    def load_folder(self, folder: Path):
+        self.cancel()
+        self.scanner = FolderScanner(folder)
+        self.scanner.signals.found.connect(self.scan_found, Qt.QueuedConnection)
+        self.scanner.signals.finished.connect(self.scan_finished, Qt.QueuedConnection)
+        self.thread_pool.start(self.scanner)
+
+    def is_current(self) -> bool:
+        # Batches of a cancelled scan may still be queued when a new one starts
+        return self.scanner is not None and self.sender() is self.scanner.signals
+
+    def scan_found(self, batch: list):
+        if self.is_current():
+            self.found.emit(batch)
+
+    def scan_finished(self, found: int, failed: int):
+        if self.is_current():
+            self.scanner = None
+            self.finished.emit(found, failed)
+
+    def cancel(self):
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner = None
+
+    def is_loading(self) -> bool:
+        return self.scanner is not None
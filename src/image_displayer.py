@@ -1,8 +1,7 @@
 from pathlib import Path
+from typing import Optional
 
-from PIL.ImageQt import ImageQt
-from PyPDF2 import PdfFileReader
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap, QWheelEvent
 from PySide6.QtWidgets import (
     QWidget,
@@ -15,30 +14,38 @@ from PySide6.QtWidgets import (
     QLabel,
     QMessageBox,
     QGraphicsPixmapItem,
+    QCheckBox,
 )
-from pdf2image import convert_from_path
 
+from .page_cache import page_cache
+from .page_loader import PageLoader
+from .pdf_index import PDFInfo, get_pdf_index
+from .rendering import PREVIEW_PROFILE, SCENE_DPI
 from .step_slider import StepSlider
+from .rects import DrawableRect
+from .tiles import TILE_SIZE, TileKey, TileRenderer, tile_dpi, visible_tiles
 
+PREFETCH_PAGES = 2
 
-class PDFFile(QWidget):
-    def __init__(self, path: str):
-        super().__init__()
 
+class PDFFile:
+    def __init__(self, path: str, info: Optional[PDFInfo] = None):
         self.path: Path = Path(path)
-        self.page_count: int = len(PdfFileReader(path).pages)
-
-        self.pages: dict[QPixmap] = {
-            1: QPixmap.fromImage(ImageQt(convert_from_path(self.path, first_page=1, last_page=1)[0]))
-        }
+        # Page count and sizes come from the index, the first page is rendered later by the PageLoader
+        self.info: PDFInfo = info if info is not None else get_pdf_index().get(self.path)
+        self.page_count: int = self.info.page_count
 
     def __str__(self):
         return self.path.name
 
-    def update_page(self, number: int):
-        if number not in self.pages:
-            pixmap = QPixmap.fromImage(ImageQt(convert_from_path(self.path, first_page=number, last_page=number)[0]))
-            self.pages[number] = pixmap
+    def page_size(self, number: int) -> tuple[int, int]:
+        return self.info.page_size(number, SCENE_DPI)
+
+    def cached_page(self, number: int) -> Optional[QPixmap]:
+        return page_cache.get((self.path, number))
+
+    def close(self):
+        page_cache.discard_file(self.path)
 
     def file_name(self):
         return self.path.name.split(".")[0]
@@ -110,8 +117,33 @@ class ImageDisplayer(QWidget):
         self.zoom_label = QLabel(f"Zoom: {self.zoom}%")
         self.buttons_layout.addWidget(self.zoom_label)
 
+        self.tiles_checkbox = QCheckBox("Sharp zoom")
+        self.tiles_checkbox.setChecked(True)
+        self.tiles_checkbox.toggled.connect(self.update_tiles)
+        self.buttons_layout.addWidget(self.tiles_checkbox)
+
         self.setMinimumSize(400, 400)
 
+        self.loader = PageLoader()
+        self.loader.page_ready.connect(self.page_ready)
+
+        # The scene keeps its items, page changes only swap pixmaps and add or remove the overlays that changed
+        self.page_item: QGraphicsPixmapItem = self.scene.addPixmap(QPixmap())
+        self.page_item.setZValue(-2)
+        self.page_item.hide()
+        self.tile_items: dict[TileKey, QGraphicsPixmapItem] = {}
+        self.rect_items: set[DrawableRect] = set()
+        self.tiles = TileRenderer()
+        self.tiles.tiles_ready.connect(self.tiles_ready)
+
+        # Tiles are recomputed once scrolling or zooming settles
+        self.tiles_timer = QTimer()
+        self.tiles_timer.setSingleShot(True)
+        self.tiles_timer.setInterval(50)
+        self.tiles_timer.timeout.connect(self.update_tiles)
+        self.view.horizontalScrollBar().valueChanged.connect(self.tiles_timer.start)
+        self.view.verticalScrollBar().valueChanged.connect(self.tiles_timer.start)
+
     def wheelEvent(self, event: QWheelEvent):
         if event.angleDelta().y() > 0:
             self.zoom_in()
@@ -131,6 +163,7 @@ class ImageDisplayer(QWidget):
 
         transform = self.view.transform().scale(self.zoom / 100, self.zoom / 100)
         self.view.setTransform(transform)
+        self.tiles_timer.start()
 
     def update_file(self, file: PDFFile):
         self.file = file
@@ -141,40 +174,104 @@ class ImageDisplayer(QWidget):
 
         self.update_page()
 
-        for item in self.scene.items():
-            if isinstance(item, QGraphicsPixmapItem):
-                self.view.fitInView(item, Qt.KeepAspectRatio)
-                break
+        self.view.fitInView(self.page_item, Qt.KeepAspectRatio)
 
         self.set_zoom(self.zoom)
 
     def update_page(self):
         self.pages.setText(f"{self.current_page}/{self.file.page_count}")
-        self.file.update_page(self.current_page)
+        self.loader.load(self.file.path, self.current_page, self.prefetch_pages())
         self.update_scene()
 
+    def prefetch_pages(self) -> list[int]:
+        pages = []
+        for offset in range(1, PREFETCH_PAGES + 1):
+            pages += [self.current_page + offset, self.current_page - offset]
+
+        for page in self.window.rect_model.page_numbers():
+            if page not in pages:
+                pages.append(page)
+
+        return [page for page in pages if 1 <= page <= self.file.page_count and page != self.current_page]
+
+    def page_ready(self, path: Path, number: int):
+        if self.file is not None and self.file.path == path and self.current_page == number:
+            self.update_page_item()
+
     def update_scene(self):
-        # Take out all the items from the scene but don't delete them
-        for item in self.scene.items():
-            self.scene.removeItem(item)
+        self.update_page_item()
+        self.update_tiles()
+        self.update_rects()
 
+    def update_page_item(self):
         if self.file is None:
+            self.page_item.hide()
             return
 
-        self.scene.addPixmap(self.file.pages[self.current_page])
+        pixmap = self.file.cached_page(self.current_page)
+        if pixmap is not None:
+            scale = SCENE_DPI / PREVIEW_PROFILE.dpi
+        else:
+            # Low resolution preview (or blank page) scaled up to the full page size until the render arrives
+            pixmap, scale = self.loader.placeholder(
+                self.file.path, self.current_page, self.file.page_size(self.current_page)
+            )
+        self.page_item.setPixmap(pixmap)
+        self.page_item.setScale(scale)
+        self.page_item.show()
+
+    def update_rects(self):
+        # Only the rects of this page are looked at, however many the template has
+        wanted = set()
+        if self.file is not None:
+            rects = self.window.rect_model.on_page(self.current_page)
+            wanted = {rect.drawable_rect for rect in rects if rect.is_selected()}
+
+        for item in self.rect_items - wanted:
+            self.scene.removeItem(item)
+        for item in wanted - self.rect_items:
+            self.scene.addItem(item)
+        self.rect_items = wanted
+
+    def tiles_ready(self, path: Path, number: int, dpi: int):
+        if self.file is not None and self.file.path == path and self.current_page == number:
+            self.update_tiles()
 
-        for i in range(self.window.rect_list_widget.count()):
-            rect = self.window.rect_list_widget.itemWidget(self.window.rect_list_widget.item(i))
+    def update_tiles(self):
+        wanted = self.wanted_tiles()
+        for key in [key for key in self.tile_items if key not in wanted]:
+            self.scene.removeItem(self.tile_items.pop(key))
 
-            if rect is None:
-                break
-            if rect.page != self.current_page:
+        for key, pixmap in wanted.items():
+            if key in self.tile_items:
                 continue
-            if not rect.drawable_rect.is_selected:
-                continue
-
-            self.scene.addItem(rect.drawable_rect)
-            rect.drawable_rect.setPos(rect.drawable_rect.pos())
+            _, _, dpi, column, row = key
+            item = self.scene.addPixmap(pixmap)
+            item.setScale(SCENE_DPI / dpi)
+            item.setPos(column * TILE_SIZE * SCENE_DPI / dpi, row * TILE_SIZE * SCENE_DPI / dpi)
+            item.setZValue(-1)
+            self.tile_items[key] = item
+
+    def wanted_tiles(self) -> dict[TileKey, QPixmap]:
+        if self.file is None or not self.page_item.isVisible() or not self.tiles_checkbox.isChecked():
+            return {}
+
+        # Only worth it when one pixel of the preview render covers more than one screen pixel
+        scale = self.view.transform().m11()
+        if scale * SCENE_DPI <= PREVIEW_PROFILE.dpi:
+            return {}
+
+        dpi = tile_dpi(scale)
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        tiles = visible_tiles(visible, self.page_item.sceneBoundingRect(), dpi)
+        self.tiles.request(self.file.path, self.current_page, dpi, tiles)
+
+        wanted = {}
+        for column, row in tiles:
+            pixmap = self.tiles.tile(self.file.path, self.current_page, dpi, column, row)
+            if pixmap is not None:
+                wanted[(self.file.path, self.current_page, dpi, column, row)] = pixmap
+        return wanted
 
     def go_to_next_page(self):
         if self.file is None:
@@ -0,0 +1,162 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt
+
+PROGRESS_INTERVAL = 0.1  # Seconds between progress updates sent to the GUI thread
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class JobSignals(QObject):
+    progress = Signal(str, int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class Job(QRunnable):
+    def __init__(self, name: str, work: Callable[["Job"], object], cleanup: Optional[Callable[[], None]] = None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.work = work
+        # Runs instead of work() when the job is cancelled before it starts, to close what work() would have closed
+        self.cleanup = cleanup
+        self.signals = JobSignals()
+        self._cancelled = threading.Event()
+        self._cancel_callbacks: list[Callable[[], None]] = []
+        self._last_progress = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+        for callback in self._cancel_callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]):
+        # For work that has its own way of stopping, like the OCR worker processes
+        self._cancel_callbacks.append(callback)
+        if self._cancelled.is_set():
+            callback()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def progress(self, stage: str, done: int, total: int):
+        # Throttled, one signal per crop would flood the GUI thread's event queue
+        now = time.monotonic()
+        if 0 < done < total and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        self.signals.progress.emit(stage, done, total)
+
+    def run(self):
+        if self._cancelled.is_set():
+            try:
+                if self.cleanup is not None:
+                    self.cleanup()
+            except Exception as e:
+                self.signals.failed.emit(str(e))
+            else:
+                self.signals.cancelled.emit()
+            return
+
+        try:
+            result = self.work(self)
+        except Exception as e:
+            # Whatever the work raised while stopping is part of being cancelled
+            if self._cancelled.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class JobScheduler(QObject):
+    # Name, stage, done, total, items per second and seconds left (None until there is a rate)
+    progress = Signal(str, str, int, int, float, object)
+    idle = Signal()
+    failed = Signal(str, str)
+
+    def __init__(self):
+        super().__init__()
+        # One job at a time, later ones wait in the pool's queue
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self.jobs: list[Job] = []
+        self.stage: Optional[tuple[Job, str]] = None
+        self.stage_start = (0.0, 0)  # Time and items done when the current stage started
+
+    def submit(
+        self,
+        name: str,
+        work: Callable[[Job], object],
+        finished: Callable[[object], None],
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        job = Job(name, work, cleanup)
+        job.signals.progress.connect(self.job_progress, Qt.QueuedConnection)
+        job.signals.finished.connect(finished, Qt.QueuedConnection)
+        job.signals.finished.connect(self.job_done, Qt.QueuedConnection)
+        job.signals.failed.connect(self.job_failed, Qt.QueuedConnection)
+        job.signals.cancelled.connect(self.job_done, Qt.QueuedConnection)
+        self.jobs.append(job)
+        self.thread_pool.start(job)
+        return job
+
+    def job_of(self, signals: QObject) -> Optional[Job]:
+        return next((job for job in self.jobs if job.signals is signals), None)
+
+    def job_progress(self, stage: str, done: int, total: int):
+        job = self.job_of(self.sender())
+        if job is None:
+            return
+
+        now = time.monotonic()
+        if self.stage != (job, stage):
+            self.stage = (job, stage)
+            self.stage_start = (now, done)
+        start_time, start_done = self.stage_start
+        elapsed = now - start_time
+        rate = (done - start_done) / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else None
+        self.progress.emit(job.name, stage, done, total, rate, eta)
+
+    def job_done(self, *args):
+        job = self.job_of(self.sender())
+        if job is not None:
+            self.jobs.remove(job)
+        if not self.jobs:
+            self.stage = None
+            self.idle.emit()
+
+    def job_failed(self, error: str):
+        job = self.job_of(self.sender())
+        if job is not None:
+            self.failed.emit(job.name, error)
+        self.job_done()
+
+    def pending(self) -> int:
+        return len(self.jobs)
+
+    def cancel(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self.thread_pool.waitForDone()
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from .rendering import EXPORT_PROFILE, OCR_PROFILE, RenderProfile
+from .template import POINTS_DPI, PickleRect
+
+JOURNAL_NAME = ".journal.sqlite3"
+
+OCRKey = tuple[str, str, str, str]  # File and rect names, fingerprint of the OCR source and geometry of the rect
+
+
+def fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def geometry(rect: PickleRect, profile: RenderProfile) -> str:
+    # The render profile changes the crop as much as the box does
+    points = rect.converted(POINTS_DPI)
+    box = [round(value, 3) for value in (points.x, points.y, points.width, points.height)]
+    return json.dumps(box + [rect.page, profile.dpi, profile.mode])
+
+
+def ocr_keys(path: Path, rects: list[PickleRect], profile: RenderProfile = OCR_PROFILE) -> list[OCRKey]:
+    current = fingerprint(path)
+    return [(path.name, rect.name, current, geometry(rect, profile)) for rect in rects]
+
+
+class Journal:
+    def __init__(self, output_folder: Path):
+        output_folder.mkdir(parents=True, exist_ok=True)
+        self.path = output_folder / JOURNAL_NAME
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL keeps the per-result commits cheap while still surviving a crash
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        # Manifest of the output tree: which PDF and rect geometry each PNG was made from
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            "file TEXT NOT NULL, rect TEXT NOT NULL, fingerprint TEXT NOT NULL, geometry TEXT NOT NULL, "
+            "PRIMARY KEY (file, rect))"
+        )
+        # Results of journals from before they had the source of every result cannot be checked, they are dropped
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(ocr)")]
+        if columns and "fingerprint" not in columns:
+            self.connection.execute("DROP TABLE ocr")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ocr ("
+            "file TEXT NOT NULL, rect TEXT NOT NULL, fingerprint TEXT NOT NULL, geometry TEXT NOT NULL, "
+            "text TEXT NOT NULL, PRIMARY KEY (file, rect))"
+        )
+        self.connection.commit()
+
+    def outdated(
+        self, path: Path, rects: list[PickleRect], output_folder: Path, profile: RenderProfile = EXPORT_PROFILE
+    ) -> list[PickleRect]:
+        rows = self.connection.execute("SELECT rect, fingerprint, geometry FROM outputs WHERE file = ?", (path.name,))
+        outputs = {rect: (file_fingerprint, rect_geometry) for rect, file_fingerprint, rect_geometry in rows}
+        current = fingerprint(path)
+        return [
+            rect
+            for rect in rects
+            if outputs.get(rect.name) != (current, geometry(rect, profile))
+            or not (output_folder / path.name / f"{rect.name}.png").exists()
+        ]
+
+    def mark_extracted(self, path: Path, rects: list[PickleRect], profile: RenderProfile = EXPORT_PROFILE):
+        current = fingerprint(path)
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO outputs (file, rect, fingerprint, geometry) VALUES (?, ?, ?, ?)",
+            [(path.name, rect.name, current, geometry(rect, profile)) for rect in rects],
+        )
+        # OCR results of the previous crops no longer apply
+        self.connection.executemany(
+            "DELETE FROM ocr WHERE file = ? AND rect = ?", [(path.name, rect.name) for rect in rects]
+        )
+        self.connection.commit()
+
+    def ocr_result(self, key: OCRKey) -> Optional[str]:
+        # A result from another version of the PDF or crop, or from a rect since moved, is not done
+        file, rect, file_fingerprint, rect_geometry = key
+        row = self.connection.execute(
+            "SELECT text FROM ocr WHERE file = ? AND rect = ? AND fingerprint = ? AND geometry = ?",
+            (file, rect, file_fingerprint, rect_geometry),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def record_ocr(self, key: OCRKey, text: str):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO ocr (file, rect, fingerprint, geometry, text) VALUES (?, ?, ?, ?, ?)", (*key, text)
+        )
+        self.connection.commit()
+
+    def has_ocr_results(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM ocr LIMIT 1").fetchone() is not None
+
+    def clear_extractions(self):
+        self.connection.execute("DELETE FROM outputs")
+        self.connection.commit()
+
+    def clear_ocr_results(self):
+        self.connection.execute("DELETE FROM ocr")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
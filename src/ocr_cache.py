@@ -0,0 +1,77 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+DEFAULT_CACHE_PATH = Path.home() / ".pdf_screenshots" / "ocr_cache.sqlite3"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # Bytes of stored text
+
+
+def image_key(image: Image.Image, lang: str, config: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:{lang}:{config}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class OCRCache:
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_size: int = DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key: str, text: str):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, text, len(text.encode()), time.time()),
+        )
+
+    def commit(self):
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        # Drop the least recently used results until the cache fits in its budget again
+        rows = self.connection.execute("SELECT key, size FROM results ORDER BY last_used")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", stale)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
@@ -1,16 +1,335 @@
+import math
+import os
+import shlex
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
 
 import pytesseract
-from pytesseract import image_to_string
+from pytesseract import Output, image_to_data, image_to_string
+import numpy as np
 from PIL import Image
+
+from .ocr_cache import OCRCache, image_key
+from .preprocessing import PreprocessOptions, preprocess
+from .word_index import Word, assign_words
 pytesseract.pytesseract.tesseract_cmd = Path('..') / "Tesseract" / "tesseract.exe"
 
+MAX_BATCH_SIZE = 32
+STREAM_BATCH_SIZE = 8  # Without a known total, small enough to keep every worker busy on a small run
+
+OCRSource = Union[Path, Image.Image, np.ndarray]
+
+
+def open_source(source: OCRSource) -> Image.Image:
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, np.ndarray):
+        return Image.fromarray(source)
+    return Image.open(source)
+
+
+def prepare_image(source: OCRSource, preprocess_options: Optional[PreprocessOptions] = None) -> Image.Image:
+    image = open_source(source)
+    if preprocess_options is not None:
+        image = Image.fromarray(preprocess(np.asarray(image), preprocess_options))
+    return image
 
-def perform_ocr(path: Path):
-    image = Image.open(path)
-    text = image_to_string(image, lang='eng')
+
+def pnm_image(image: Image.Image) -> Image.Image:
+    # PNM only stores bilevel, grayscale and RGB images. Transparent pixels become white, as pytesseract does
+    if image.mode in ("1", "L", "RGB"):
+        return image
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    if "A" not in image.getbands():
+        return image.convert("RGB")
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image.convert("RGBA"), mask=image.getchannel("A"))
+    return background
+
+
+def perform_ocr(
+    source: OCRSource, lang: str = 'eng', config: str = '', preprocess_options: Optional[PreprocessOptions] = None
+):
+    image = prepare_image(source, preprocess_options)
+    text = image_to_string(image, lang=lang, config=config)
     return text
 
 
+class TesserocrRecognizer:
+    # Tesseract C API through tesserocr, the language data is loaded once per worker process
+    def __init__(self, tesseract_cmd, lang: str, config: str):
+        import tesserocr
+
+        kwargs = {"lang": lang}
+        tessdata = Path(tesseract_cmd).parent / "tessdata"
+        if tessdata.is_dir():
+            kwargs["path"] = str(tessdata)
+
+        arguments = shlex.split(config)
+        variables = {}
+        for i, argument in enumerate(arguments[:-1]):
+            if argument == "--psm":
+                kwargs["psm"] = int(arguments[i + 1])
+            elif argument == "-c" and "=" in arguments[i + 1]:
+                name, value = arguments[i + 1].split("=", 1)
+                variables[name] = value
+
+        self.tesserocr = tesserocr
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in variables.items():
+            self.api.SetVariable(name, value)
+
+    def recognise(self, images: list[Image.Image]) -> list[str]:
+        texts = []
+        for image in images:
+            self.api.SetImage(image)
+            texts.append(self.api.GetUTF8Text())
+        return texts
+
+    def words(self, image: Image.Image) -> list[Word]:
+        RIL = self.tesserocr.RIL
+        self.api.SetImage(image)
+        self.api.Recognize()
+        iterator = self.api.GetIterator()
+        if iterator is None:
+            return []
+
+        words = []
+        line = 0
+        for word in self.tesserocr.iterate_level(iterator, RIL.WORD):
+            if word.IsAtBeginningOf(RIL.TEXTLINE):
+                line += 1
+            text = word.GetUTF8Text(RIL.WORD)
+            box = word.BoundingBox(RIL.WORD)
+            if text and text.strip() and box is not None:
+                words.append(Word(tuple(box), text.strip(), line))
+        return words
+
+
+class ListFileRecognizer:
+    # Without tesserocr, a whole batch goes through one tesseract process using its list file input
+    def __init__(self, tesseract_cmd, lang: str, config: str):
+        self.tesseract_cmd = str(tesseract_cmd)
+        self.lang = lang
+        self.config = config
+
+    def recognise(self, images: list[Image.Image]) -> list[str]:
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            for i, image in enumerate(images):
+                path = Path(folder) / f"{i}.pnm"
+                pnm_image(image).save(path)
+                paths.append(str(path))
+            list_file = Path(folder) / "images.txt"
+            list_file.write_text("\n".join(paths) + "\n")
+
+            args = [self.tesseract_cmd, str(list_file), "stdout", "-l", self.lang, *shlex.split(self.config)]
+            output = subprocess.run(args, capture_output=True, check=True).stdout.decode("utf-8")
+
+        # Tesseract ends the text of every image with a form feed
+        texts = output.split("\f")[:len(images)]
+        if len(texts) != len(images):
+            raise RuntimeError(f"Tesseract returned {len(texts)} results for {len(images)} images")
+        return texts
+
+    def words(self, image: Image.Image) -> list[Word]:
+        data = image_to_data(image, lang=self.lang, config=self.config, output_type=Output.DICT)
+        lines: dict[tuple[int, int, int], int] = {}
+        words = []
+        for i, text in enumerate(data["text"]):
+            if not text.strip():
+                continue
+            line = lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), len(lines))
+            left, top = data["left"][i], data["top"][i]
+            words.append(Word((left, top, left + data["width"][i], top + data["height"][i]), text.strip(), line))
+        return words
+
+
+_recognizer = None
+
+
+def _init_worker(tesseract_cmd, lang: str = 'eng', config: str = ''):
+    # Worker processes re-import this module, so the command configured by the parent has to be passed explicitly
+    global _recognizer
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    try:
+        _recognizer = TesserocrRecognizer(tesseract_cmd, lang, config)
+    except ImportError:
+        _recognizer = ListFileRecognizer(tesseract_cmd, lang, config)
+
+
+def recognise_batch(sources: list[OCRSource], preprocess_options: list[Optional[PreprocessOptions]]) -> list[str]:
+    images = [prepare_image(source, options) for source, options in zip(sources, preprocess_options)]
+    return _recognizer.recognise(images)
+
+
+def recognise_region(
+    source: OCRSource, boxes: list[tuple[int, int, int, int]], preprocess_options: Optional[PreprocessOptions]
+) -> list[str]:
+    # One layout analysis for the whole region, the words are then split between the rects inside it
+    return assign_words(_recognizer.words(prepare_image(source, preprocess_options)), boxes)
+
+
+class OCRCancelled(Exception):
+    pass
+
+
+class OCREngine:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        cache: Optional[OCRCache] = None,
+        lang: str = 'eng',
+        config: str = '',
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.lang = lang
+        self.config = config
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(
+        self,
+        sources: list[OCRSource],
+        progress: Optional[Callable[[int, int], None]] = None,
+        result: Optional[Callable[[int, str], None]] = None,
+        preprocess_options: Optional[list[Optional[PreprocessOptions]]] = None,
+    ) -> list[str]:
+        results: list[Optional[str]] = [None] * len(sources)
+        if preprocess_options is None:
+            preprocess_options = [None] * len(sources)
+        finished = 0
+
+        def stream_result(index: int, text: str):
+            nonlocal finished
+            finished += 1
+            results[index] = text
+            if result is not None:
+                result(index, text)
+            if progress is not None:
+                progress(finished, len(sources))
+
+        # Crops are sent in batches, small enough to keep every worker busy
+        batch_size = max(1, min(MAX_BATCH_SIZE, math.ceil(len(sources) / (self.workers * 4))))
+        self.run_stream(zip(sources, preprocess_options), stream_result, batch_size)
+        return results
+
+    def run_stream(
+        self,
+        sources: Iterable[tuple[OCRSource, Optional[PreprocessOptions]]],
+        result: Callable[[int, str], None],
+        batch_size: int = STREAM_BATCH_SIZE,
+    ):
+        # Never cleared, an engine is built for one run and a cancel that came before it still counts
+        if self._cancelled.is_set():
+            raise OCRCancelled()
+        # Sources are only pulled from the iterable when the workers need more, so a caller can render them one
+        # file at a time while the previous ones are recognised. Results are numbered in the order they were pulled
+        sources = iter(sources)
+        executor = None
+        try:
+            pending = {}
+            pulled = 0
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < self.workers * 2:
+                    if self._cancelled.is_set():
+                        raise OCRCancelled()
+                    batch = []  # Index, source, options and cache key
+                    while len(batch) < batch_size:
+                        item = next(sources, None)
+                        if item is None:
+                            exhausted = True
+                            break
+                        source, options = item
+                        index = pulled
+                        pulled += 1
+                        key = None
+                        if self.cache is not None:
+                            # Preprocessing changes the result, so its settings are part of the key
+                            key = image_key(open_source(source), self.lang, f"{self.config}|{options}")
+                            text = self.cache.get(key)
+                            if text is not None:
+                                result(index, text)
+                                continue
+                        batch.append((index, source, options, key))
+                    if not batch:
+                        continue
+                    if executor is None:
+                        executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            initializer=_init_worker,
+                            initargs=(pytesseract.pytesseract.tesseract_cmd, self.lang, self.config),
+                        )
+                    future = executor.submit(
+                        recognise_batch, [source for _, source, _, _ in batch], [options for _, _, options, _ in batch]
+                    )
+                    # Only the indexes and keys are kept, the crops go with the batch to the worker
+                    pending[future] = [(index, key) for index, _, _, key in batch]
+                if not pending:
+                    break
+
+                # Poll so that progress callbacks (and with them, cancel buttons) keep running between results
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for (index, key), text in zip(pending.pop(future), future.result()):
+                        if key is not None:
+                            self.cache.put(key, text)
+                        result(index, text)
+                if self._cancelled.is_set():
+                    raise OCRCancelled()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=not self._cancelled.is_set(), cancel_futures=True)
+            if self.cache is not None:
+                self.cache.commit()
+
+    def run_regions(
+        self,
+        regions: Iterable[tuple[OCRSource, list[tuple[int, int, int, int]], Optional[PreprocessOptions]]],
+        result: Callable[[int, list[str]], None],
+    ):
+        # The regions are only rendered when pulled from the iterable, a few at a time, while workers recognise
+        # the previous ones
+        if self._cancelled.is_set():
+            raise OCRCancelled()
+        regions = iter(regions)
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(pytesseract.pytesseract.tesseract_cmd, self.lang, self.config),
+        )
+        try:
+            pending = {}
+            submitted = 0
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < self.workers * 2:
+                    region = next(regions, None)
+                    if region is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(recognise_region, *region)] = submitted
+                    submitted += 1
+                if not pending:
+                    break
+
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result(pending.pop(future), future.result())
+                if self._cancelled.is_set():
+                    raise OCRCancelled()
+        finally:
+            executor.shutdown(wait=not self._cancelled.is_set(), cancel_futures=True)
+
+
 if __name__ == '__main__':
     perform_ocr(Path('..') / "images")
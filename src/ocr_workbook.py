@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Protocol
+
+from .journal import Journal, OCRKey, fingerprint
+from .ocr_cache import OCRCache
+from .ocr_tools import OCREngine, OCRSource
+from .preprocessing import PreprocessOptions
+from .results_writer import ResultsWriter, RowBuffer
+
+OCRCell = tuple[OCRKey, Optional[OCRSource]]  # Journal key and the image, None if already done
+
+
+class OCRJob(Protocol):
+    # What the OCR needs from the job it runs in, jobs.Job in the app
+    def progress(self, stage: str, done: int, total: int): ...
+
+    def on_cancel(self, callback: Callable[[], None]): ...
+
+    def check_cancelled(self): ...
+
+
+def crop_cell(folder: Path, crop: Path) -> OCRCell:
+    # A saved crop is the whole OCR source, a new extraction changes its fingerprint
+    return (folder.name, crop.stem, fingerprint(crop) if crop.exists() else "", ""), crop
+
+
+def folder_rows(output_folder: Path, rect_columns: bool) -> tuple[list[str], list[tuple[str, list[OCRCell]]]]:
+    # The crops saved in the output folder, one subfolder per PDF, as the header and rows of a workbook
+    folders = sorted(f for f in output_folder.iterdir() if f.is_dir())
+    if rect_columns:
+        header = ["", *[r.name for r in sorted(folders[0].iterdir())]]
+        rows = [
+            (file.name, [crop_cell(file, rect) for rect in sorted(file.iterdir()) if rect.is_file()])
+            for file in folders
+        ]
+    else:
+        header = ["", *[f.name for f in folders]]
+        rects = sorted(r for r in folders[0].iterdir() if r.is_file())
+        rows = [(rect.name, [crop_cell(file, rect) for file in folders]) for rect in rects]
+    return header, rows
+
+
+def ocr_to_workbook(
+    job: OCRJob,
+    writer: ResultsWriter,
+    header: list[str],
+    rows: list[tuple[str, list[OCRKey]]],
+    cells: Iterable[OCRCell],
+    journal: Journal,
+    cache: OCRCache,
+    workers: int,
+    preprocess_options: Callable[[str], Optional[PreprocessOptions]],
+) -> tuple[Path, int, int]:
+    # Runs inside a job, nothing here may touch the widgets. The cells are pulled as the OCR workers need
+    # more crops, so a generator can render them while the previous ones are recognised
+    writer.write_row(header)
+    buffer = RowBuffer(writer, rows)
+    total = sum(len(row_cells) for _, row_cells in rows)
+
+    cache.reset_stats()
+    engine = OCREngine(workers, cache)
+    job.on_cancel(engine.cancel)
+
+    done = 0
+    pulled: list[OCRKey] = []  # Keys of the crops in the order they were given to the engine
+
+    def known(key: OCRKey, text: Optional[str]):
+        nonlocal done
+        buffer.set(key, text)
+        done += 1
+        job.progress("Running OCR", done, total)
+
+    def crops():
+        for key, source in cells:
+            text = journal.ocr_result(key)
+            if text is not None or source is None:
+                # Done by a previous run, the text layer or page OCR. None when that failed
+                known(key, text)
+                continue
+            pulled.append(key)
+            # Crops in the output folder are matched to the loaded rects by name
+            yield source, preprocess_options(key[1])
+
+    def result(index: int, text: str):
+        journal.record_ocr(pulled[index], text)
+        known(pulled[index], text)
+
+    # Cancel may have been pressed while the job was being set up
+    job.check_cancelled()
+    engine.run_stream(crops(), result)
+    buffer.finish()
+    return writer.path, cache.hits, cache.misses
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from PySide6.QtGui import QPixmap
+
+DEFAULT_BUDGET = 512 * 1024 * 1024  # Bytes
+
+
+def pixmap_size(pixmap: QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class PageCache:
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.pages: OrderedDict[tuple, QPixmap] = OrderedDict()
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.pages
+
+    def get(self, key: tuple) -> Optional[QPixmap]:
+        pixmap = self.pages.get(key)
+        if pixmap is not None:
+            self.pages.move_to_end(key)
+        return pixmap
+
+    def put(self, key: tuple, pixmap: QPixmap):
+        self.remove(key)
+        self.pages[key] = pixmap
+        self.size += pixmap_size(pixmap)
+        self.evict()
+
+    def remove(self, key: tuple):
+        pixmap = self.pages.pop(key, None)
+        if pixmap is not None:
+            self.size -= pixmap_size(pixmap)
+
+    def discard_file(self, path: Path):
+        for key in [key for key in self.pages if key[0] == path]:
+            self.remove(key)
+
+    def set_budget(self, budget: int):
+        self.budget = budget
+        self.evict()
+
+    def evict(self):
+        # The most recently used page always stays, even if it alone is over budget
+        while self.size > self.budget and len(self.pages) > 1:
+            _, pixmap = self.pages.popitem(last=False)
+            self.size -= pixmap_size(pixmap)
+
+
+page_cache = PageCache()
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL.ImageQt import ImageQt
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt
+from PySide6.QtGui import QImage, QPixmap
+
+from .page_cache import page_cache
+from .rendering import PREVIEW_PROFILE, SCENE_DPI, render_page
+
+THUMBNAIL_DPI = 30
+MAX_THUMBNAILS = 256
+
+THUMBNAIL_PRIORITY = 2
+PAGE_PRIORITY = 1
+PREFETCH_PRIORITY = 0
+
+
+class RenderSignals(QObject):
+    rendered = Signal(object, int, int, QImage)
+    failed = Signal(object, int, int, str)
+
+
+class RenderTask(QRunnable):
+    def __init__(self, path: Path, number: int, dpi: int):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.number = number
+        self.dpi = dpi
+        self.signals = RenderSignals()
+
+    def run(self):
+        try:
+            # QPixmap may only be created on the GUI thread, so a detached QImage is sent back instead
+            image = ImageQt(render_page(self.path, self.number, self.dpi, PREVIEW_PROFILE.mode)).copy()
+        except Exception as e:
+            self.signals.failed.emit(self.path, self.number, self.dpi, str(e))
+            return
+        self.signals.rendered.emit(self.path, self.number, self.dpi, image)
+
+
+class PageLoader(QObject):
+    page_ready = Signal(object, int)
+
+    def __init__(self, max_threads: int = 2):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self.tasks: dict[tuple[Path, int, int], RenderTask] = {}
+        self.thumbnails: OrderedDict[tuple[Path, int], QPixmap] = OrderedDict()
+
+    def load(self, path: Path, number: int, prefetch: list[int]):
+        wanted = {(path, number, PREVIEW_PROFILE.dpi), (path, number, THUMBNAIL_DPI)}
+        wanted.update((path, page, PREVIEW_PROFILE.dpi) for page in prefetch)
+        self.cancel_pending(wanted)
+
+        if (path, number) not in page_cache:
+            if (path, number) not in self.thumbnails:
+                self.request(path, number, THUMBNAIL_DPI, THUMBNAIL_PRIORITY)
+            self.request(path, number, PREVIEW_PROFILE.dpi, PAGE_PRIORITY)
+
+        for page in prefetch:
+            if (path, page) not in page_cache:
+                self.request(path, page, PREVIEW_PROFILE.dpi, PREFETCH_PRIORITY)
+
+    def request(self, path: Path, number: int, dpi: int, priority: int):
+        key = (path, number, dpi)
+        if key in self.tasks:
+            return
+
+        task = RenderTask(path, number, dpi)
+        task.signals.rendered.connect(self.rendered, Qt.QueuedConnection)
+        task.signals.failed.connect(self.failed, Qt.QueuedConnection)
+        self.tasks[key] = task
+        self.thread_pool.start(task, priority)
+
+    def cancel_pending(self, keep: set[tuple[Path, int, int]]):
+        # Only tasks still waiting in the queue can be taken back, running renders are left to finish
+        for key, task in list(self.tasks.items()):
+            if key not in keep and self.thread_pool.tryTake(task):
+                del self.tasks[key]
+
+    def rendered(self, path: Path, number: int, dpi: int, image: QImage):
+        self.tasks.pop((path, number, dpi), None)
+
+        pixmap = QPixmap.fromImage(image)
+        if dpi == PREVIEW_PROFILE.dpi:
+            page_cache.put((path, number), pixmap)
+        else:
+            self.thumbnails[(path, number)] = pixmap
+            while len(self.thumbnails) > MAX_THUMBNAILS:
+                self.thumbnails.popitem(last=False)
+
+        self.page_ready.emit(path, number)
+
+    def failed(self, path: Path, number: int, dpi: int, error: str):
+        self.tasks.pop((path, number, dpi), None)
+
+    def placeholder(self, path: Path, number: int, size: tuple[int, int]) -> tuple[QPixmap, float]:
+        thumbnail = self.thumbnails.get((path, number))
+        if thumbnail is not None:
+            return thumbnail, SCENE_DPI / THUMBNAIL_DPI
+
+        pixmap = QPixmap(*size)
+        pixmap.fill(Qt.white)
+        return pixmap, 1.0
+
+    def discard_file(self, path: Path):
+        for key in [key for key in self.thumbnails if key[0] == path]:
+            del self.thumbnails[key]
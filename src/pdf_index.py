@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from PyPDF2 import PdfFileReader
+
+DEFAULT_INDEX_PATH = Path.home() / ".pdf_screenshots" / "pdf_index.sqlite3"
+INFO_VERSION = 2  # Entries written by an older read_info are read again
+
+
+@dataclass
+class PDFInfo:
+    page_count: int
+    page_sizes: list[tuple[float, float]]  # Points, rotation already applied
+
+    def page_size(self, number: int, dpi: int) -> tuple[int, int]:
+        width, height = self.page_sizes[number - 1]
+        return round(width * dpi / 72), round(height * dpi / 72)
+
+
+def read_info(path: Path) -> PDFInfo:
+    # Only the page tree is walked, page contents are never parsed
+    reader = PdfFileReader(str(path), strict=False)
+    page_sizes = []
+    for page in reader.pages:
+        # The renderers draw the CropBox, which is the MediaBox when a page has none. Inherited /CropBox and
+        # /Rotate values were copied to every page when the page tree was flattened
+        box = page.cropBox
+        width, height = abs(float(box.getWidth())), abs(float(box.getHeight()))
+        rotate = page["/Rotate"] if "/Rotate" in page else 0
+        if int(rotate) % 180 == 90:
+            width, height = height, width
+        page_sizes.append((width, height))
+    return PDFInfo(len(page_sizes), page_sizes)
+
+
+class PDFIndex:
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, info TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, path: Path) -> PDFInfo:
+        path = path.absolute()
+        stat = path.stat()
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT info FROM files WHERE path = ? AND size = ? AND mtime = ?",
+                (str(path), stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        if row is not None:
+            info = json.loads(row[0])
+            if info.get("version") == INFO_VERSION:
+                return PDFInfo(info["page_count"], [tuple(size) for size in info["page_sizes"]])
+
+        info = read_info(path)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, info) VALUES (?, ?, ?, ?)",
+                (
+                    str(path),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    json.dumps(
+                        {"version": INFO_VERSION, "page_count": info.page_count, "page_sizes": info.page_sizes}
+                    ),
+                ),
+            )
+            self.connection.commit()
+        return info
+
+
+_pdf_index: PDFIndex = None
+_pdf_index_lock = threading.Lock()
+
+
+def get_pdf_index() -> PDFIndex:
+    # Created on first use, importing the app's modules does not touch the home directory
+    global _pdf_index
+    with _pdf_index_lock:
+        if _pdf_index is None:
+            _pdf_index = PDFIndex()
+    return _pdf_index
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+from .template import PickleRect
+
+
+@dataclass
+class PagePlan:
+    page: int
+    rects: list[PickleRect]
+    dpi: int
+    box: tuple[int, int, int, int]
+
+    def relative_box(self, rect: PickleRect) -> tuple[int, int, int, int]:
+        left, top, right, bottom = rect.box(self.dpi)
+        return left - self.box[0], top - self.box[1], right - self.box[0], bottom - self.box[1]
+
+
+def union_box(rects: list[PickleRect], dpi: int) -> tuple[int, int, int, int]:
+    boxes = [rect.box(dpi) for rect in rects]
+    return (
+        max(0, min(b[0] for b in boxes)),
+        max(0, min(b[1] for b in boxes)),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def plan_pages(rects: list[PickleRect], dpi: int) -> list[PagePlan]:
+    pages: dict[int, list[PickleRect]] = {}
+    for rect in rects:
+        pages.setdefault(rect.page, []).append(rect)
+
+    return [
+        PagePlan(page, page_rects, dpi, union_box(page_rects, dpi)) for page, page_rects in sorted(pages.items())
+    ]
@@ -0,0 +1,91 @@
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import cv2
+import numpy as np
+
+TARGET_X_HEIGHT = 24  # Pixels, tesseract works best with x-heights of about 20 to 30 pixels
+MAX_DESKEW_ANGLE = 15  # Degrees, larger angles are more likely a bad estimate than a skewed scan
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    grayscale: bool = True
+    denoise: bool = True
+    binarize: bool = True
+    deskew: bool = True
+    target_x_height: Optional[int] = TARGET_X_HEIGHT
+
+
+DEFAULT_OPTIONS = PreprocessOptions()
+
+
+def to_grayscale(array: np.ndarray) -> np.ndarray:
+    if array.ndim == 2:
+        return array
+    if array.shape[2] == 4:
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def deskew(gray: np.ndarray) -> np.ndarray:
+    ink = np.column_stack(np.nonzero(binarize(gray) == 0)).astype(np.float32)
+    if len(ink) < 10:
+        return gray
+
+    angle = cv2.minAreaRect(ink[:, ::-1])[-1]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > MAX_DESKEW_ANGLE:
+        return gray
+
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderValue=255)
+
+
+def x_height(binary: np.ndarray) -> Optional[float]:
+    count, _, stats, _ = cv2.connectedComponentsWithStats(255 - binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    # Specks and lines are not letters
+    heights = heights[(heights > 3) & (heights < binary.shape[0] * 0.9)]
+    if len(heights) == 0:
+        return None
+    return float(np.median(heights))
+
+
+def downscale(gray: np.ndarray, binary: np.ndarray, target: int) -> np.ndarray:
+    height = x_height(binary)
+    if height is None or height <= target:
+        return gray
+
+    scale = target / height
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def preprocess(array: np.ndarray, options: PreprocessOptions = DEFAULT_OPTIONS) -> np.ndarray:
+    if not any((options.grayscale, options.denoise, options.deskew, options.binarize, options.target_x_height)):
+        return array
+
+    image = to_grayscale(array)
+    if options.denoise:
+        image = cv2.fastNlMeansDenoising(image, h=10)
+    if options.deskew:
+        image = deskew(image)
+    if options.target_x_height is not None:
+        image = downscale(image, binarize(image), options.target_x_height)
+    if options.binarize:
+        image = binarize(image)
+    return image
+
+
+def in_place(options: Optional[PreprocessOptions]) -> Optional[PreprocessOptions]:
+    # Deskewing and rescaling move the text, so they are left out when word boxes have to map back onto the page
+    if options is None:
+        return None
+    return replace(options, deskew=False, target_x_height=None)
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from .rects import Rect
+from .template import PickleRect
+
+
+class RectModel(QAbstractListModel):
+    def __init__(self):
+        super().__init__()
+        self.rects: list[Rect] = []
+        # Rects of every page, so the viewer never has to look through all of them
+        self.pages: dict[int, list[Rect]] = {}
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rects)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        rect = self.rects[index.row()]
+        if role == Qt.DisplayRole:
+            return rect.name
+        if role == Qt.ToolTipRole:
+            return f"Page {rect.page}"
+        if role == Qt.UserRole:
+            return rect
+        return None
+
+    def rect(self, index: QModelIndex) -> Optional[Rect]:
+        return self.rects[index.row()] if index.isValid() else None
+
+    def row(self, rect: Rect) -> int:
+        return self.rects.index(rect)
+
+    def on_page(self, page: int) -> list[Rect]:
+        return self.pages.get(page, [])
+
+    def page_numbers(self) -> list[int]:
+        return sorted(self.pages)
+
+    def add(self, rects: list[Rect]):
+        if not rects:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rects), len(self.rects) + len(rects) - 1)
+        self.rects.extend(rects)
+        for rect in rects:
+            self.pages.setdefault(rect.page, []).append(rect)
+        self.endInsertRows()
+
+    def add_pickles(self, pickle_rects: list[PickleRect]):
+        self.add([Rect.from_pickle(pickle_rect) for pickle_rect in pickle_rects])
+
+    def remove(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        rect = self.rects.pop(row)
+        page_rects = self.pages[rect.page]
+        page_rects.remove(rect)
+        if not page_rects:
+            del self.pages[rect.page]
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rects = []
+        self.pages = {}
+        self.endResetModel()
+
+    def rename(self, rect: Rect, name: str):
+        rect.name = name
+        index = self.index(self.row(rect))
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def pickles(self) -> list[PickleRect]:
+        return [rect.get_pickle() for rect in self.rects]
@@ -1,30 +1,18 @@
-from dataclasses import dataclass
+from dataclasses import replace
 from enum import Enum
+from typing import Optional
 
 from PySide6.QtCore import Qt, QPoint
-from PySide6.QtGui import QPen, QPixmap
+from PySide6.QtGui import QPen
 from PySide6.QtWidgets import (
-    QWidget,
-    QMenu,
-    QHBoxLayout,
-    QLabel,
     QGraphicsRectItem,
     QGraphicsSceneHoverEvent,
     QGraphicsSceneMouseEvent,
     QGraphicsItem,
 )
 
-from .image_displayer import PDFFile
-
-
-@dataclass
-class PickleRect:
-    x: int
-    y: int
-    width: int
-    height: int
-    name: str
-    page: int
+from .rendering import SCENE_DPI
+from .template import POINTS_DPI, PickleRect
 
 
 class SelectedResize(Enum):
@@ -47,21 +35,11 @@ class DrawableRect(QGraphicsRectItem):
         self.selected_edge = None
         self.is_selected = False
 
+        # Set on the item rather than in paint(), so the bounding rect covers the pen and moving the rect only
+        # repaints the area it left and the area it entered
+        self.setPen(QPen(Qt.red, 10, Qt.SolidLine))
         self.setAcceptHoverEvents(True)
         self.setFlag(QGraphicsItem.ItemIsMovable, True)
-        self.setFlag(QGraphicsItem.ItemSendsGeometryChanges, True)
-
-    def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value):
-        if change == QGraphicsItem.ItemPositionChange:
-            if self.scene() is not None:
-                self.scene().update()
-        return QGraphicsRectItem.itemChange(self, change, value)
-
-    def paint(self, painter, option, widget=None):
-        QGraphicsRectItem.paint(self, painter, option, widget)
-        painter.setPen(QPen(Qt.red, 10, Qt.SolidLine))
-        painter.setBrush(Qt.transparent)
-        painter.drawRect(self.rect())
 
     def hoverMoveEvent(self, event: QGraphicsSceneHoverEvent):
         t = 15  # threshold
@@ -135,56 +113,52 @@ class DrawableRect(QGraphicsRectItem):
         self.setRect(self.rect().normalized())
 
 
-class Rect(QWidget):
-    def __init__(self, window, name: str, page: int):
-        QWidget.__init__(self)
-
-        self.window = window
+class Rect:
+    # A rect of the template. Its graphics item is only created once the rect is shown, until then the geometry
+    # stays in the PickleRect it was loaded from
+    def __init__(self, name: str, page: int):
         self.name = name
         self.page = page
-
-        self.drawable_rect = DrawableRect(0, 0, 300, 150)
-        self.drawable_rect.setPos(10, 10)
-
-        self.main_layout = QHBoxLayout()
-        self.setLayout(self.main_layout)
-
-        self.label = QLabel(self.name)
-        self.main_layout.addWidget(self.label)
-
-        self.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.customContextMenuRequested.connect(self.show_context_menu)
-
-    def show_context_menu(self, pos: QPoint):
-        menu = QMenu()
-        menu.addAction("Rename", self.window.rename_rect)
-        menu.addAction("Remove", self.window.remove_rect)
-        menu.exec(self.mapToGlobal(pos))
-
-    def sizeHint(self):
-        return self.minimumSizeHint()
-
-    def crop_image(self, file: PDFFile) -> QPixmap:
-        pixmap = file.pages[self.page]
-        rect = self.drawable_rect.rect().toRect()
-        offset = self.drawable_rect.pos().toPoint()
-        rect.translate(offset)
-        pixmap = pixmap.copy(rect.x(), rect.y(), rect.width(), rect.height())
-        return pixmap
+        self.preprocess = True
+        self.pickle_rect: Optional[PickleRect] = None
+        self._drawable_rect: Optional[DrawableRect] = None
+
+    @property
+    def drawable_rect(self) -> DrawableRect:
+        if self._drawable_rect is None:
+            self._drawable_rect = DrawableRect(0, 0, 300, 150)
+            self._drawable_rect.setPos(10, 10)
+            if self.pickle_rect is not None:
+                scene_rect = self.pickle_rect.converted(SCENE_DPI)
+                self._drawable_rect.setPos(scene_rect.x, scene_rect.y)
+                self._drawable_rect.setRect(0, 0, scene_rect.width, scene_rect.height)
+        return self._drawable_rect
+
+    def toggle_preprocess(self):
+        self.preprocess = not self.preprocess
+
+    def is_selected(self) -> bool:
+        return self._drawable_rect is not None and self._drawable_rect.is_selected
 
     def get_pickle(self):
+        if self._drawable_rect is None and self.pickle_rect is not None:
+            return replace(self.pickle_rect, name=self.name, page=self.page, preprocess=self.preprocess)
+
+        # Stored in points, independent of the DPI the page is rendered at
         return PickleRect(
             self.drawable_rect.pos().x(),
             self.drawable_rect.pos().y(),
             self.drawable_rect.rect().width(),
             self.drawable_rect.rect().height(),
             self.name,
-            self.page
-        )
+            self.page,
+            self.preprocess,
+            SCENE_DPI,
+        ).converted(POINTS_DPI)
 
     @classmethod
-    def from_pickle(cls, window, pickle_rect: PickleRect):
-        rect = cls(window, pickle_rect.name, pickle_rect.page)
-        rect.drawable_rect.setPos(pickle_rect.x, pickle_rect.y)
-        rect.drawable_rect.setRect(0, 0, pickle_rect.width, pickle_rect.height)
+    def from_pickle(cls, pickle_rect: PickleRect):
+        rect = cls(pickle_rect.name, pickle_rect.page)
+        rect.preprocess = pickle_rect.preprocess
+        rect.pickle_rect = pickle_rect
         return rect
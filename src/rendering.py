@@ -0,0 +1,156 @@
+import io
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+from pdf2image import convert_from_path
+
+DEFAULT_DPI = 200
+SCENE_DPI = 200  # One unit of the viewer's scene is one pixel of the page at this DPI
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    dpi: int
+    mode: str  # PIL mode, "RGB", "L" or "1"
+
+
+PREVIEW_PROFILE = RenderProfile(100, "L")
+OCR_PROFILE = RenderProfile(300, "L")
+EXPORT_PROFILE = RenderProfile(200, "RGB")
+
+# PDFium is not thread safe, every call into it from any thread has to hold this lock
+PDFIUM_LOCK = threading.RLock()
+
+
+def convert_mode(image: Image.Image, mode: str) -> Image.Image:
+    if image.mode == mode:
+        return image
+    if mode == "1":
+        # A plain threshold, PIL's default conversion dithers
+        return image.convert("L").point(lambda value: 255 if value >= 128 else 0, mode="1")
+    return image.convert(mode)
+
+
+class RenderBackend(ABC):
+    name = ""
+
+    @abstractmethod
+    def render_page(self, path: Path, number: int, dpi: int = DEFAULT_DPI, mode: str = "RGB") -> Image.Image:
+        pass
+
+    @abstractmethod
+    def render_region(
+        self, path: Path, number: int, box: tuple[int, int, int, int], dpi: int = DEFAULT_DPI, mode: str = "RGB"
+    ) -> Image.Image:
+        pass
+
+
+class PopplerBackend(RenderBackend):
+    # pdftoppm subprocess per call, through pdf2image for whole pages
+    name = "poppler"
+
+    def render_page(self, path: Path, number: int, dpi: int = DEFAULT_DPI, mode: str = "RGB") -> Image.Image:
+        # The CropBox, like PDFium and the page sizes of pdf_index, not the MediaBox pdftoppm draws by default
+        image = convert_from_path(
+            path, dpi=dpi, first_page=number, last_page=number, grayscale=mode != "RGB", use_cropbox=True
+        )[0]
+        return convert_mode(image, mode)
+
+    def render_region(
+        self, path: Path, number: int, box: tuple[int, int, int, int], dpi: int = DEFAULT_DPI, mode: str = "RGB"
+    ) -> Image.Image:
+        # pdf2image has no crop options, but pdftoppm can rasterise just a window of the page
+        left, top, right, bottom = box
+        args = [
+            "pdftoppm",
+            "-f", str(number),
+            "-l", str(number),
+            "-r", str(dpi),
+            "-cropbox",
+            "-x", str(left),
+            "-y", str(top),
+            "-W", str(right - left),
+            "-H", str(bottom - top),
+            *(["-gray"] if mode != "RGB" else []),
+            str(path),
+        ]
+        output = subprocess.run(args, capture_output=True, check=True).stdout
+        image = Image.open(io.BytesIO(output))
+        image.load()
+        return convert_mode(image, mode)
+
+
+class PdfiumBackend(RenderBackend):
+    # In-process rendering straight into a bitmap, no subprocess and no temporary files
+    name = "pdfium"
+
+    def __init__(self):
+        import pypdfium2
+
+        self.pdfium = pypdfium2
+
+    def render(self, path: Path, number: int, dpi: int, mode: str, box=None) -> Image.Image:
+        scale = dpi / 72
+        with PDFIUM_LOCK:
+            pdf = self.pdfium.PdfDocument(str(path))
+            try:
+                page = pdf[number - 1]
+                crop = (0, 0, 0, 0)
+                if box is not None:
+                    # PDFium crops in points from each border of the rendered page, get_size already has /Rotate
+                    # applied
+                    width, height = page.get_size()
+                    left, top, right, bottom = box
+                    crop = (
+                        max(0.0, left / scale),
+                        max(0.0, height - bottom / scale),
+                        max(0.0, width - right / scale),
+                        max(0.0, top / scale),
+                    )
+                image = page.render(scale=scale, crop=crop, grayscale=mode != "RGB").to_pil()
+                # The PIL image shares the bitmap's buffer, which does not outlive the document
+                return image.copy() if image.mode == mode else convert_mode(image, mode)
+            finally:
+                pdf.close()
+
+    def render_page(self, path: Path, number: int, dpi: int = DEFAULT_DPI, mode: str = "RGB") -> Image.Image:
+        return self.render(path, number, dpi, mode)
+
+    def render_region(
+        self, path: Path, number: int, box: tuple[int, int, int, int], dpi: int = DEFAULT_DPI, mode: str = "RGB"
+    ) -> Image.Image:
+        return self.render(path, number, dpi, mode, box)
+
+
+BACKENDS = {backend.name: backend for backend in (PdfiumBackend, PopplerBackend)}
+
+_backend: RenderBackend = None
+
+
+def set_backend(name: str):
+    global _backend
+    _backend = BACKENDS[name]()
+
+
+def get_backend() -> RenderBackend:
+    global _backend
+    if _backend is None:
+        try:
+            _backend = PdfiumBackend()
+        except ImportError:
+            _backend = PopplerBackend()
+    return _backend
+
+
+def render_page(path: Path, number: int, dpi: int = DEFAULT_DPI, mode: str = "RGB") -> Image.Image:
+    return get_backend().render_page(path, number, dpi, mode)
+
+
+def render_region(
+    path: Path, number: int, box: tuple[int, int, int, int], dpi: int = DEFAULT_DPI, mode: str = "RGB"
+) -> Image.Image:
+    return get_backend().render_region(path, number, box, dpi, mode)
@@ -0,0 +1,177 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Hashable, Optional
+
+from openpyxl import Workbook
+
+FILE_FILTER = "Excel files (*.xlsx);;CSV files (*.csv);;JSON lines (*.jsonl);;Parquet files (*.parquet)"
+
+
+class ResultsWriter(ABC):
+    def __init__(self, path: Path):
+        self.path = path
+
+    @abstractmethod
+    def write_row(self, row: list):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+
+class XLSXResultsWriter(ResultsWriter):
+    # Write-only workbooks stream rows to a temporary file instead of keeping every cell in memory
+    def __init__(self, path: Path):
+        super().__init__(path)
+        open(path, "ab").close()  # Fail early if the file is open in Excel
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("OCR results")
+
+    def write_row(self, row: list):
+        self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class CSVResultsWriter(ResultsWriter):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+
+    def write_row(self, row: list):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JSONLResultsWriter(ResultsWriter):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_row(self, row: list):
+        self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def unique_names(names: list[str]) -> list[str]:
+    # Two files or rects may share a name, Parquet readers need every column name once
+    seen = set(names)
+    unique = []
+    used = set()
+    for name in names:
+        candidate = name
+        number = 2
+        while candidate in used or (candidate != name and candidate in seen):
+            candidate = f"{name} ({number})"
+            number += 1
+        used.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+class ParquetResultsWriter(ResultsWriter):
+    ROW_GROUP_SIZE = 256
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow, install it with 'pip install pyarrow'")
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.columns = None
+        self.rows = []
+        self.writer = None
+
+    def write_row(self, row: list):
+        # The first row is the header and becomes the schema
+        if self.columns is None:
+            self.columns = unique_names([str(column) or "name" for column in row])
+            return
+
+        # A folder with fewer crops than the first one gives a short row, its missing cells stay empty
+        if len(row) > len(self.columns):
+            raise ValueError(f"Row {row[0]!r} has {len(row)} cells but the header only has {len(self.columns)}")
+        self.rows.append([*row, *[None] * (len(self.columns) - len(row))])
+        if len(self.rows) >= self.ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        # Typed as strings, a column of Nones alone would not match the schema of the first row group
+        arrays = [
+            self.pyarrow.array(
+                [str(row[i]) if row[i] is not None else None for row in self.rows], self.pyarrow.string()
+            )
+            for i in range(len(self.columns))
+        ]
+        table = self.pyarrow.Table.from_arrays(arrays, names=self.columns)
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {
+    ".xlsx": XLSXResultsWriter,
+    ".csv": CSVResultsWriter,
+    ".jsonl": JSONLResultsWriter,
+    ".parquet": ParquetResultsWriter,
+}
+
+
+class RowBuffer:
+    # Rows are written, in order, as soon as all of their cells are known. Only the texts wait, never the images
+    def __init__(self, writer: ResultsWriter, rows: list[tuple[str, list[Hashable]]]):
+        self.writer = writer
+        self.rows = rows
+        self.remaining = [len(cells) for _, cells in rows]
+        self.row_of = {cell: i for i, (_, cells) in enumerate(rows) for cell in cells}
+        self.texts: dict[Hashable, Optional[str]] = {}
+        self.known: set[Hashable] = set()
+        self.next_row = 0
+
+    def set(self, cell: Hashable, text: Optional[str]):
+        if cell in self.known:
+            return
+        self.known.add(cell)
+        self.texts[cell] = text
+        self.remaining[self.row_of[cell]] -= 1
+        while self.next_row < len(self.rows) and self.remaining[self.next_row] == 0:
+            name, cells = self.rows[self.next_row]
+            self.writer.write_row([name, *[self.texts.pop(cell) for cell in cells]])
+            self.next_row += 1
+
+    def finish(self):
+        # Cells that never got a text, like those of a file that could not be rendered, are left empty
+        for _, cells in self.rows[self.next_row:]:
+            for cell in cells:
+                self.set(cell, None)
+
+
+def open_writer(path: Path) -> ResultsWriter:
+    writer = WRITERS.get(path.suffix.lower())
+    if writer is None:
+        raise ValueError(f"Unsupported results format {path.suffix}, use one of {', '.join(WRITERS)}")
+    return writer(path)
@@ -0,0 +1,152 @@
+import io
+import json
+import pickle
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Optional
+
+from .rendering import EXPORT_PROFILE, OCR_PROFILE, RenderProfile
+
+POINTS_DPI = 72
+LEGACY_DPI = 200  # Rects files saved before coordinates were stored in points hold pixels at this DPI
+
+TEMPLATE_FORMAT = "pdf-screenshots-rects"
+TEMPLATE_VERSION = 1
+# Tasks a template can set the render profile of, and the profile used when it does not
+RENDER_DEFAULTS = {"ocr": OCR_PROFILE, "export": EXPORT_PROFILE}
+RENDER_MODES = ("RGB", "L", "1")
+
+
+@dataclass
+class PickleRect:
+    x: float
+    y: float
+    width: float
+    height: float
+    name: str
+    page: int
+    preprocess: bool = True
+    dpi: float = LEGACY_DPI  # Unit of the coordinates, in pixels per inch
+
+    def converted(self, dpi: float) -> "PickleRect":
+        factor = dpi / self.dpi
+        return replace(
+            self, x=self.x * factor, y=self.y * factor, width=self.width * factor, height=self.height * factor, dpi=dpi
+        )
+
+    def box(self, dpi: float) -> tuple[int, int, int, int]:
+        rect = self.converted(dpi)
+        left, top = round(rect.x), round(rect.y)
+        return left, top, left + round(rect.width), top + round(rect.height)
+
+
+@dataclass
+class Template:
+    rects: list[PickleRect]
+    render: dict[str, RenderProfile] = field(default_factory=dict)  # Only the tasks the file sets
+
+    def profile(self, task: str) -> RenderProfile:
+        return self.render.get(task, RENDER_DEFAULTS[task])
+
+
+class LegacyRect:
+    # Stand-in for the classes found in old pickled rects files, only its attributes are used
+    pass
+
+
+class LegacyUnpickler(pickle.Unpickler):
+    # Old rects files are plain pickles, nothing but the rect class they contain may be loaded from them
+    RECT_CLASSES = {("src.rects", "PickleRect"), ("src.template", "PickleRect")}
+    # Used by the oldest pickle protocols to rebuild plain objects
+    OBJECT_HELPERS = {
+        ("copyreg", "_reconstructor"),
+        ("copy_reg", "_reconstructor"),
+        ("builtins", "object"),
+        ("__builtin__", "object"),
+    }
+
+    def find_class(self, module: str, name: str):
+        if (module, name) in self.RECT_CLASSES:
+            return LegacyRect
+        if (module, name) in self.OBJECT_HELPERS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a rects file")
+
+
+def load_legacy_rects(data: bytes) -> list[PickleRect]:
+    rects = LegacyUnpickler(io.BytesIO(data)).load()
+    # Files saved before a field existed get its default
+    return [
+        PickleRect(
+            r.x, r.y, r.width, r.height, r.name, r.page, getattr(r, "preprocess", True), getattr(r, "dpi", LEGACY_DPI)
+        )
+        for r in rects
+    ]
+
+
+def rect_to_json(rect: PickleRect) -> dict:
+    rect = rect.converted(POINTS_DPI)
+    data = {
+        "name": rect.name,
+        "page": rect.page,
+        "box": [round(value, 3) for value in (rect.x, rect.y, rect.width, rect.height)],
+    }
+    # Only settings that differ from the defaults are written
+    ocr = {"preprocess": rect.preprocess} if not rect.preprocess else {}
+    if ocr:
+        data["ocr"] = ocr
+    return data
+
+
+def rect_from_json(data: dict, dpi: float) -> PickleRect:
+    x, y, width, height = data["box"]
+    ocr = data.get("ocr", {})
+    return PickleRect(x, y, width, height, data["name"], int(data["page"]), bool(ocr.get("preprocess", True)), dpi)
+
+
+def render_from_json(data: dict) -> dict[str, RenderProfile]:
+    render = {}
+    for task, settings in data.items():
+        if task not in RENDER_DEFAULTS:
+            raise ValueError(f"Unknown render task {task!r}, use one of {', '.join(RENDER_DEFAULTS)}")
+        default = RENDER_DEFAULTS[task]
+        profile = RenderProfile(int(settings.get("dpi", default.dpi)), settings.get("mode", default.mode))
+        if profile.dpi <= 0 or profile.mode not in RENDER_MODES:
+            raise ValueError(f"Invalid {task} render settings {settings}")
+        render[task] = profile
+    return render
+
+
+def load_template(path: Path) -> Template:
+    data = Path(path).read_bytes()
+    if not data.lstrip().startswith(b"{"):
+        return Template(load_legacy_rects(data))
+
+    template = json.loads(data)
+    if template.get("format") != TEMPLATE_FORMAT:
+        raise ValueError(f"{path} is not a rects file")
+    if template.get("version", 0) > TEMPLATE_VERSION:
+        raise ValueError(f"{path} was saved by a newer version (format version {template['version']})")
+    dpi = template.get("dpi", POINTS_DPI)
+    rects = [rect_from_json(rect, dpi) for rect in template["rects"]]
+    return Template(rects, render_from_json(template.get("render", {})))
+
+
+def load_rects(path: Path) -> list[PickleRect]:
+    return load_template(path).rects
+
+
+def save_rects(path: Path, rects: list[PickleRect], render: Optional[dict[str, RenderProfile]] = None):
+    template = {
+        "format": TEMPLATE_FORMAT,
+        "version": TEMPLATE_VERSION,
+        "dpi": POINTS_DPI,
+    }
+    if render:
+        # Render DPI and colour mode of the tasks the template sets, the others keep the app's defaults
+        template["render"] = {task: {"dpi": profile.dpi, "mode": profile.mode} for task, profile in render.items()}
+    template["rects"] = [rect_to_json(rect) for rect in rects]
+    # One rect per line, small and still readable in a diff
+    lines = ",\n".join(json.dumps(rect, separators=(",", ":")) for rect in template.pop("rects"))
+    header = json.dumps(template, separators=(",", ":"))[:-1]
+    Path(path).write_text(f'{header},"rects":[\n{lines}\n]}}\n', encoding="utf-8")
@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import Optional
+
+import pypdfium2 as pdfium
+
+from .rendering import PDFIUM_LOCK
+from .template import POINTS_DPI, PickleRect
+
+
+def pdf_box(rect: PickleRect, page_box: tuple[float, float, float, float]):
+    # Rect coordinates have their origin at the top left corner of the rendered page box,
+    # while PDF user space has it at the bottom left
+    box_left, _, _, box_top = page_box
+    points = rect.converted(POINTS_DPI)
+    return (
+        box_left + points.x,
+        box_top - points.y - points.height,
+        box_left + points.x + points.width,
+        box_top - points.y,
+    )
+
+
+def extract_text(path: Path, rects: list[PickleRect]) -> list[Optional[str]]:
+    texts: list[Optional[str]] = [None] * len(rects)
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            pages = {}
+            for i, rect in enumerate(rects):
+                if rect.page not in pages:
+                    page = pdf[rect.page - 1]
+                    # Rotated pages would need the box rotated too, they are left to OCR
+                    pages[rect.page] = (page, page.get_textpage()) if page.get_rotation() == 0 else None
+                if pages[rect.page] is None:
+                    continue
+
+                page, text_page = pages[rect.page]
+                left, bottom, right, top = pdf_box(rect, page.get_cropbox())
+                text = text_page.get_text_bounded(left=left, bottom=bottom, right=right, top=top)
+                if text.strip():
+                    texts[i] = text
+        finally:
+            pdf.close()
+    return texts
@@ -0,0 +1,119 @@
+import math
+from pathlib import Path
+
+from PIL.ImageQt import ImageQt
+from PySide6.QtCore import QObject, QRectF, QRunnable, QThreadPool, Signal, Qt
+from PySide6.QtGui import QImage, QPixmap
+
+from .page_cache import PageCache
+from .rendering import PREVIEW_PROFILE, SCENE_DPI, render_region
+
+TILE_SIZE = 512  # Pixels at the tile DPI
+DPI_STEP = 50
+MAX_TILE_DPI = 1200
+TILE_CACHE_BUDGET = 256 * 1024 * 1024  # Bytes
+
+TileKey = tuple[Path, int, int, int, int]  # path, page, dpi, column, row
+
+
+def tile_dpi(scale: float) -> int:
+    # Quantised so that every zoom level maps to a small set of cached resolutions
+    return min(MAX_TILE_DPI, math.ceil(SCENE_DPI * scale / DPI_STEP) * DPI_STEP)
+
+
+def visible_tiles(visible: QRectF, page: QRectF, dpi: int) -> list[tuple[int, int]]:
+    area = visible.intersected(page)
+    if area.isEmpty():
+        return []
+
+    factor = dpi / SCENE_DPI
+    first_column = max(0, int(area.left() * factor) // TILE_SIZE)
+    first_row = max(0, int(area.top() * factor) // TILE_SIZE)
+    last_column = int(math.ceil(area.right() * factor) - 1) // TILE_SIZE
+    last_row = int(math.ceil(area.bottom() * factor) - 1) // TILE_SIZE
+    return [
+        (column, row)
+        for row in range(first_row, last_row + 1)
+        for column in range(first_column, last_column + 1)
+    ]
+
+
+class TileSignals(QObject):
+    rendered = Signal(object, object)
+
+
+class TileTask(QRunnable):
+    def __init__(self, path: Path, number: int, dpi: int, tiles: list[tuple[int, int]]):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.number = number
+        self.dpi = dpi
+        self.tiles = tiles
+        self.signals = TileSignals()
+
+    def run(self):
+        # A single render of the bounding box of the missing tiles, sliced afterwards
+        left = min(column for column, _ in self.tiles) * TILE_SIZE
+        top = min(row for _, row in self.tiles) * TILE_SIZE
+        right = (max(column for column, _ in self.tiles) + 1) * TILE_SIZE
+        bottom = (max(row for _, row in self.tiles) + 1) * TILE_SIZE
+        try:
+            region = ImageQt(
+                render_region(self.path, self.number, (left, top, right, bottom), self.dpi, PREVIEW_PROFILE.mode)
+            )
+        except Exception:
+            self.signals.rendered.emit(self, {})
+            return
+
+        images: dict[tuple[int, int], QImage] = {}
+        for column, row in self.tiles:
+            x = column * TILE_SIZE - left
+            y = row * TILE_SIZE - top
+            width = min(TILE_SIZE, region.width() - x)
+            height = min(TILE_SIZE, region.height() - y)
+            if width > 0 and height > 0:
+                images[(column, row)] = region.copy(x, y, width, height)
+        self.signals.rendered.emit(self, images)
+
+
+class TileRenderer(QObject):
+    tiles_ready = Signal(object, int, int)
+
+    def __init__(self, max_threads: int = 2):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self.cache = PageCache(TILE_CACHE_BUDGET)
+        self.pending: set[TileKey] = set()
+        self.tasks: set[TileTask] = set()
+
+    def tile(self, path: Path, number: int, dpi: int, column: int, row: int) -> QPixmap:
+        return self.cache.get((path, number, dpi, column, row))
+
+    def request(self, path: Path, number: int, dpi: int, tiles: list[tuple[int, int]]):
+        missing = [
+            (column, row)
+            for column, row in tiles
+            if (path, number, dpi, column, row) not in self.cache
+            and (path, number, dpi, column, row) not in self.pending
+        ]
+        if not missing:
+            return
+
+        self.pending.update((path, number, dpi, column, row) for column, row in missing)
+        task = TileTask(path, number, dpi, missing)
+        task.signals.rendered.connect(self.rendered, Qt.QueuedConnection)
+        self.tasks.add(task)
+        self.thread_pool.start(task)
+
+    def rendered(self, task: TileTask, images: dict[tuple[int, int], QImage]):
+        self.tasks.discard(task)
+        key = (task.path, task.number, task.dpi)
+        self.pending.difference_update((*key, column, row) for column, row in task.tiles)
+        for (column, row), image in images.items():
+            self.cache.put((*key, column, row), QPixmap.fromImage(image))
+        self.tiles_ready.emit(*key)
+
+    def discard_file(self, path: Path):
+        self.cache.discard_file(path)
@@ -1,8 +1,9 @@
 import os
 import pickle
 from pathlib import Path
+from typing import Callable, Iterator, Optional
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QPoint, Qt
 from PySide6.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -10,19 +11,47 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QFileDialog,
+    QListView,
     QListWidget,
     QLabel,
     QListWidgetItem,
+    QMenu,
     QMessageBox,
     QInputDialog,
     QRadioButton,
+    QProgressBar,
+    QSpinBox,
+    QCheckBox,
 )
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
+from .batch import crop_document, duplicate_names, extract_document, render_regions, save_crops
+from .file_loader import FileLoader
 from .image_displayer import ImageDisplayer, PDFFile
-from .ocr_tools import perform_ocr
-from .rects import Rect, PickleRect
+from .jobs import Job, JobScheduler, format_duration
+from .journal import Journal, OCRKey, ocr_keys
+from .ocr_cache import OCRCache
+from .ocr_tools import OCREngine
+from .ocr_workbook import OCRCell, folder_rows, ocr_to_workbook
+from .preprocessing import DEFAULT_OPTIONS, PreprocessOptions, in_place
+from .rect_model import RectModel
+from .rects import Rect
+from .planner import plan_pages
+from .rendering import RenderProfile
+from .results_writer import FILE_FILTER, ResultsWriter, open_writer
+from .template import RENDER_DEFAULTS, PickleRect, load_template, save_rects
+from .text_layer import extract_text
+
+FileFailure = tuple[Path, str]  # A file a job skipped and the error it raised
+MAX_LISTED_FAILURES = 10
+
+
+def failures_text(failures: list[FileFailure]) -> str:
+    if not failures:
+        return ""
+    lines = [f"{path.name}: {error}" for path, error in failures[:MAX_LISTED_FAILURES]]
+    if len(failures) > MAX_LISTED_FAILURES:
+        lines.append(f"and {len(failures) - MAX_LISTED_FAILURES} more")
+    return f"\n\n{len(failures)} files could not be read and were skipped:\n" + "\n".join(lines)
 
 
 class MainWindow(QMainWindow):
@@ -38,8 +67,19 @@ class MainWindow(QMainWindow):
         self.left_layout = QVBoxLayout()
         self.central_layout.addLayout(self.left_layout)
 
+        self.load_buttons_layout = QHBoxLayout()
+        self.left_layout.addLayout(self.load_buttons_layout)
+
         self.load_pdf_button = QPushButton("Load PDF")
-        self.left_layout.addWidget(self.load_pdf_button)
+        self.load_buttons_layout.addWidget(self.load_pdf_button)
+
+        self.load_folder_button = QPushButton("Load folder")
+        self.load_folder_button.clicked.connect(self.load_folder)
+        self.load_buttons_layout.addWidget(self.load_folder_button)
+
+        self.file_loader = FileLoader()
+        self.file_loader.found.connect(self.add_found_files)
+        self.file_loader.finished.connect(self.folder_loaded)
 
         self.pdf_buttons_layout = QHBoxLayout()
         self.left_layout.addLayout(self.pdf_buttons_layout)
@@ -76,9 +116,15 @@ class MainWindow(QMainWindow):
         self.buttons_row_layout.addWidget(self.vload_button)
 
         self.list_dsl_layout = QHBoxLayout()
-        self.rect_list_widget = QListWidget()
-        self.list_dsl_layout.addWidget(self.rect_list_widget)
-        self.rect_list_widget.itemSelectionChanged.connect(self.focus_rect)
+        self.rect_model = RectModel()
+        self.rect_list_view = QListView()
+        self.rect_list_view.setModel(self.rect_model)
+        # Every row has the same height, so the view never measures more than one of them
+        self.rect_list_view.setUniformItemSizes(True)
+        self.list_dsl_layout.addWidget(self.rect_list_view)
+        self.rect_list_view.selectionModel().currentChanged.connect(self.focus_rect)
+        self.rect_list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.rect_list_view.customContextMenuRequested.connect(self.show_rect_context_menu)
 
         self.dsl_layout = QVBoxLayout()
         self.dsl_layout.setAlignment(Qt.AlignRight)
@@ -107,7 +153,7 @@ class MainWindow(QMainWindow):
 
         self.extract_button = QPushButton("Extract")
         self.extract_button.clicked.connect(
-            lambda: self.extract(self.rect_list_widget.itemWidget(self.rect_list_widget.currentItem()))
+            lambda: self.extract(self.current_rect())
         )
         self.bottom_buttons_row_layout.addWidget(self.extract_button)
 
@@ -120,6 +166,8 @@ class MainWindow(QMainWindow):
         self.bottom_buttons_row_layout.addWidget(self.extract_all_button)
 
         self.output_folder = Path.home() / "Desktop" / "ScreenshotMaker"  # Current user desktop
+        # Render profiles set by the loaded template, the tasks it leaves out use the defaults
+        self.template_render: dict[str, RenderProfile] = {}
         self.output_folder_label = QLabel(f"Output folder: {self.output_folder.absolute()}")
         self.left_layout.addWidget(self.output_folder_label)
 
@@ -130,6 +178,29 @@ class MainWindow(QMainWindow):
         self.run_ocr_button.clicked.connect(self.run_ocr)
         self.ocr_layout.addWidget(self.run_ocr_button)
 
+        self.extract_and_ocr_button = QPushButton("Extract + OCR")
+        self.extract_and_ocr_button.clicked.connect(self.extract_and_ocr)
+        self.ocr_layout.addWidget(self.extract_and_ocr_button)
+
+        self.save_pngs_checkbox = QCheckBox("Save PNGs")
+        self.ocr_layout.addWidget(self.save_pngs_checkbox)
+
+        self.text_layer_checkbox = QCheckBox("Use PDF text")
+        self.text_layer_checkbox.setToolTip("Read the text of digital PDFs directly, only run OCR on rects without text")
+        self.text_layer_checkbox.setChecked(True)
+        self.ocr_layout.addWidget(self.text_layer_checkbox)
+
+        self.preprocess_checkbox = QCheckBox("Preprocess")
+        self.preprocess_checkbox.setToolTip("Clean up crops before OCR, can be disabled per rect from its context menu")
+        self.preprocess_checkbox.setChecked(True)
+        self.ocr_layout.addWidget(self.preprocess_checkbox)
+
+        self.page_ocr_checkbox = QCheckBox("Page OCR")
+        self.page_ocr_checkbox.setToolTip(
+            "Recognise every page once and split its words between the rects, faster with many rects per page"
+        )
+        self.ocr_layout.addWidget(self.page_ocr_checkbox)
+
         self.rect_file_radiobutton = QRadioButton("Rect columns, file rows")
         self.rect_file_radiobutton.setChecked(True)
         self.ocr_layout.addWidget(self.rect_file_radiobutton)
@@ -137,6 +208,14 @@ class MainWindow(QMainWindow):
         self.file_rect_radiobutton = QRadioButton("File columns, rect rows")
         self.ocr_layout.addWidget(self.file_rect_radiobutton)
 
+        self.ocr_workers_label = QLabel("Workers:")
+        self.ocr_layout.addWidget(self.ocr_workers_label)
+
+        self.ocr_workers_spinbox = QSpinBox()
+        self.ocr_workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.ocr_workers_spinbox.setValue(os.cpu_count() or 1)
+        self.ocr_layout.addWidget(self.ocr_workers_spinbox)
+
         self.right_layout = QVBoxLayout()
         self.central_layout.addLayout(self.right_layout)
 
@@ -146,6 +225,66 @@ class MainWindow(QMainWindow):
 
         self.selected_rect = None
 
+        self.ocr_cache = OCRCache()
+
+        # Extraction and OCR run in the background, the window stays usable while they do
+        self.jobs = JobScheduler()
+        self.jobs.progress.connect(self.job_progress)
+        self.jobs.idle.connect(self.jobs_idle)
+        self.jobs.failed.connect(self.job_failed)
+
+        self.job_label = QLabel()
+        self.statusBar().addWidget(self.job_label, 1)
+
+        self.job_progress_bar = QProgressBar()
+        self.job_progress_bar.setMaximumWidth(200)
+        self.statusBar().addPermanentWidget(self.job_progress_bar)
+
+        self.job_cancel_button = QPushButton("Cancel")
+        self.job_cancel_button.clicked.connect(self.jobs.cancel)
+        self.statusBar().addPermanentWidget(self.job_cancel_button)
+
+        self.jobs_idle()
+
+    def closeEvent(self, event):
+        self.jobs.shutdown()
+        super().closeEvent(event)
+
+    def start_job(
+        self,
+        name: str,
+        work: Callable[[Job], object],
+        finished: Callable[[object], None],
+        cleanup: Optional[Callable[[], None]] = None,
+    ):
+        self.jobs.submit(name, work, finished, cleanup)
+        if self.jobs.pending() == 1:
+            self.job_label.setText(f"{name}: starting")
+            self.job_progress_bar.setRange(0, 0)
+        self.job_label.show()
+        self.job_progress_bar.show()
+        self.job_cancel_button.show()
+
+    def job_progress(self, name: str, stage: str, done: int, total: int, rate: float, eta: Optional[float]):
+        text = f"{name}: {stage} {done}/{total}"
+        if rate > 0:
+            text += f", {rate:.1f}/s"
+        if eta is not None:
+            text += f", {format_duration(eta)} left"
+        if self.jobs.pending() > 1:
+            text += f" ({self.jobs.pending() - 1} queued)"
+        self.job_label.setText(text)
+        self.job_progress_bar.setRange(0, total)
+        self.job_progress_bar.setValue(done)
+
+    def jobs_idle(self):
+        self.job_label.hide()
+        self.job_progress_bar.hide()
+        self.job_cancel_button.hide()
+
+    def job_failed(self, name: str, error: str):
+        QMessageBox.critical(self, f"{name} failed", error)
+
     def run_ocr(self):
         question = QMessageBox.question(
             self,
@@ -156,52 +295,230 @@ class MainWindow(QMainWindow):
         if question != QMessageBox.Yes:
             return
 
-        self.setCursor(Qt.WaitCursor)
-        workbook = Workbook()
+        journal = self.open_journal()
 
-        sheet = workbook.active
-        if sheet is None:
-            sheet = workbook.create_sheet("OCR results")
-        else:
-            sheet.title = "OCR results"
-
-        if self.rect_file_radiobutton.isChecked():
-            header = ["", *[r.name for r in self.output_folder.iterdir().__next__().iterdir()]]
-            sheet.append(header)
-
-            for file in self.output_folder.iterdir():
-                row = [file.name]
-                for rect in file.iterdir():
-                    if not rect.is_file():
-                        continue
-                    text = perform_ocr(rect)
-                    row.append(text)
-                sheet.append(row)
-        else:
-            header = ["", *[f.name for f in self.output_folder.iterdir()]]
-            sheet.append(header)
+        header, rows = folder_rows(self.output_folder, self.rect_file_radiobutton.isChecked())
 
-            rects = [r for r in self.output_folder.iterdir().__next__().iterdir() if r.is_file()]
-            for rect in rects:
-                row = [rect.name]
-                for file in self.output_folder.iterdir():
-                    if not file.is_dir():
-                        continue
-                    text = perform_ocr(file / rect.name)
-                    row.append(text)
-                sheet.append(row)
+        writer = self.open_results_writer()
+        if writer is None:
+            journal.close()
+            return
+        workers = self.ocr_workers_spinbox.value()
+        preprocess_options = self.preprocess_options()
 
-        self.setCursor(Qt.ArrowCursor)
+        def close():
+            writer.close()
+            journal.close()
 
-        while True:
+        def work(job: Job):
+            # Closed before the job reports it finished, the workbook is only saved by close()
             try:
-                file, commit = QFileDialog.getSaveFileName(
-                    self, "Save file", "../OCR_results.xlsx", "Excel files (*.xlsx)"
+                layout = [(name, [key for key, _ in row_cells]) for name, row_cells in rows]
+                cells = [cell for _, row_cells in rows for cell in row_cells]
+                result = ocr_to_workbook(
+                    job, writer, header, layout, cells, journal, self.ocr_cache, workers, preprocess_options
                 )
+                return *result, []
+            finally:
+                close()
+
+        self.start_job("OCR", work, self.ocr_finished, close)
+
+    def extract_and_ocr(self):
+        if self.rect_model.rowCount() == 0 or self.files_listwidget.count() == 0:
+            QMessageBox.critical(self, "No rects", "Please load some file and create some rects first")
+            return
+
+        rects = self.rect_model.pickles()
+        paths = self.job_paths()
+        if paths is None:
+            return
+        save_pngs = self.save_pngs_checkbox.isChecked()
+        use_text_layer = self.text_layer_checkbox.isChecked()
+        rect_columns = self.rect_file_radiobutton.isChecked()
+        page_ocr = self.page_ocr_checkbox.isChecked()
+        output_folder = self.output_folder
+        export_profile = self.render_profile("export")
+        ocr_profile = self.render_profile("ocr")
+        journal = self.open_journal()
+        writer = self.open_results_writer()
+        if writer is None:
+            journal.close()
+            return
+        workers = self.ocr_workers_spinbox.value()
+        preprocess_options = self.preprocess_options()
+
+        def close():
+            writer.close()
+            journal.close()
+
+        def prepare(path: Path, keys: dict[int, OCRKey]) -> list[PickleRect]:
+            # Only the rects without a result from a previous run are rendered
+            todo = [rect for rect in rects if journal.ocr_result(keys[id(rect)]) is None]
+            if save_pngs:
+                # The saved PNGs keep the colour export resolution, OCR gets its own grayscale render below
+                save_crops(path, todo, crop_document(path, todo, export_profile), output_folder)
+                journal.mark_extracted(path, todo, export_profile)
+            if use_text_layer:
+                # Text found in the PDF itself is stored as if it came from OCR and never reaches tesseract
+                for rect, text in zip(todo, extract_text(path, todo)):
+                    if text is not None:
+                        journal.record_ocr(keys[id(rect)], text)
+                todo = [rect for rect in todo if journal.ocr_result(keys[id(rect)]) is None]
+            return todo
+
+        def work(job: Job):
+            try:
+                documents = []  # Paths and journal keys of their rects, for the files that could be read
+                failures: list[FileFailure] = []
+                for path in paths:
+                    try:
+                        keys = ocr_keys(path, rects, ocr_profile)
+                        documents.append((path, dict(zip((id(rect) for rect in rects), keys))))
+                    except OSError as e:
+                        failures.append((path, str(e)))
+
+                if page_ocr:
+                    # Every rect left is recognised with its page here, the results are in the journal before
+                    # the rows are written
+                    pages = []
+                    for done, (path, keys) in enumerate(documents):
+                        job.check_cancelled()
+                        try:
+                            pages.append((path, prepare(path, keys)))
+                        except Exception as e:
+                            failures.append((path, str(e)))
+                        job.progress("Reading", done + 1, len(documents))
+                    failures.extend(self.page_ocr(job, pages, journal, workers, preprocess_options, ocr_profile))
+
+                def cells() -> Iterator[OCRCell]:
+                    # One file is rendered at a time, when the OCR workers are ready for more crops
+                    for path, keys in documents:
+                        crops = {}
+                        if not page_ocr:
+                            try:
+                                todo = prepare(path, keys)
+                                crops = dict(zip((id(rect) for rect in todo), crop_document(path, todo, ocr_profile)))
+                            except Exception as e:
+                                # A broken PDF leaves its cells empty, the other files still go through
+                                failures.append((path, str(e)))
+                        for rect in rects:
+                            yield keys[id(rect)], crops.pop(id(rect), None)
+
+                if rect_columns:
+                    header = ["", *[rect.name for rect in rects]]
+                    layout = [(path.name, [keys[id(rect)] for rect in rects]) for path, keys in documents]
+                else:
+                    header = ["", *[path.name for path, _ in documents]]
+                    layout = [(rect.name, [keys[id(rect)] for _, keys in documents]) for rect in rects]
+
+                result = ocr_to_workbook(
+                    job, writer, header, layout, cells(), journal, self.ocr_cache, workers, preprocess_options
+                )
+                return *result, failures
+            finally:
+                close()
+
+        self.start_job("Extract + OCR", work, self.ocr_finished, close)
+
+    def open_journal(self) -> Journal:
+        journal = Journal(self.output_folder)
+        if journal.has_ocr_results():
+            question = QMessageBox.question(
+                self,
+                "Resume previous run",
+                f"A previous run was found in {self.output_folder.absolute()}.\n"
+                f"Do you want to resume it? Choosing No starts over.",
+            )
+            if question != QMessageBox.Yes:
+                journal.clear_ocr_results()
+        return journal
+
+    def job_paths(self) -> Optional[list[Path]]:
+        paths = [file.path for file in self.get_files()]
+        duplicates = duplicate_names(paths)
+        if duplicates:
+            QMessageBox.critical(
+                self,
+                "Duplicate file names",
+                "Crops are saved in one folder per file name, these PDFs would overwrite each other:\n"
+                + "\n".join(", ".join(str(path) for path in same) for same in duplicates.values()),
+            )
+            return None
+        return paths
+
+    def render_profile(self, task: str) -> RenderProfile:
+        return self.template_render.get(task, RENDER_DEFAULTS[task])
+
+    def preprocess_options(self) -> Callable[[str], Optional[PreprocessOptions]]:
+        # Read on the GUI thread, jobs only get the options of each rect name
+        enabled = self.preprocess_checkbox.isChecked()
+        skipped = {rect.name for rect in self.rect_model.pickles() if not rect.preprocess}
+        return lambda name: DEFAULT_OPTIONS if enabled and name not in skipped else None
+
+    def page_ocr(
+        self,
+        job: Job,
+        documents: list[tuple[Path, list[PickleRect]]],
+        journal: Journal,
+        workers: int,
+        preprocess_options: Callable[[str], Optional[PreprocessOptions]],
+        profile: RenderProfile,
+    ) -> list[FileFailure]:
+        # Runs inside a job. Every page region goes through tesseract once, instead of once per rect
+        total = sum(len(plan_pages(rects, profile.dpi)) for _, rects in documents)
+        engine = OCREngine(workers)
+        job.on_cancel(engine.cancel)
+
+        plans = []  # In the order the regions were handed to the engine
+        failures: list[FileFailure] = []
+
+        def regions():
+            for path, rects in documents:
+                try:
+                    keys = dict(zip((id(rect) for rect in rects), ocr_keys(path, rects, profile)))
+                    for plan, region in render_regions(path, rects, profile):
+                        # The whole region is cleaned up when any of its rects wants it
+                        options = [preprocess_options(rect.name) for rect in plan.rects]
+                        options = next((option for option in options if option is not None), None)
+                        plans.append((keys, plan))
+                        yield region, [plan.relative_box(rect) for rect in plan.rects], in_place(options)
+                except Exception as e:
+                    # The pages of a file that cannot be rendered are skipped, the next file still gets its turn
+                    failures.append((path, str(e)))
+
+        done = 0
+
+        def result(index: int, texts: list[str]):
+            nonlocal done
+            keys, plan = plans[index]
+            for rect, text in zip(plan.rects, texts):
+                journal.record_ocr(keys[id(rect)], text)
+            done += 1
+            job.progress("Recognising pages", done, total)
+
+        job.check_cancelled()
+        engine.run_regions(regions(), result)
+        return failures
+
+    def ocr_finished(self, result: tuple[Path, int, int, list[FileFailure]]):
+        path, hits, misses, failures = result
+        question = QMessageBox.question(
+            self,
+            "OCR finished" if failures else "OCR successfully finished",
+            f"{hits} results were reused from the cache, {misses} crops were processed.{failures_text(failures)}\n\n"
+            f"Do you want to open the generated file?",
+        )
+        if question == QMessageBox.Yes:
+            os.startfile(path)
+
+    def open_results_writer(self) -> Optional[ResultsWriter]:
+        while True:
+            try:
+                file, commit = QFileDialog.getSaveFileName(self, "Save file", "../OCR_results.xlsx", FILE_FILTER)
                 if not commit:
-                    return
-                workbook.save(file)
-                break
+                    return None
+                return open_writer(Path(file))
             except PermissionError as e:
                 QMessageBox.critical(
                     self,
@@ -209,38 +526,61 @@ class MainWindow(QMainWindow):
                     f"Please close the file excel file before running OCR again. Exception:\n"
                     f"{e}",
                 )
-
-        # Adjust column width
-        for idx, col in enumerate(sheet.columns, 1):
-            sheet.column_dimensions[get_column_letter(idx)].auto_size = True
-
-        question = QMessageBox.question(self, "OCR successfully finished", "Do you want to open the generated file?")
-        if question == QMessageBox.Yes:
-            os.startfile(file)
+            except (ValueError, RuntimeError) as e:
+                QMessageBox.critical(self, "Unsupported format", str(e))
 
     def focus_rect(self):
-        if self.rect_list_widget.currentItem() is None:
+        rect = self.current_rect()
+        if rect is None:
             return
 
-        self.image_displayer.go_to_page(self.rect_list_widget.itemWidget(self.rect_list_widget.currentItem()).page)
-        self.rect_list_widget.itemWidget(self.rect_list_widget.currentItem()).drawable_rect.is_selected = True
-        if self.selected_rect is not None:
+        self.image_displayer.go_to_page(rect.page)
+        rect.drawable_rect.is_selected = True
+        if self.selected_rect is not None and self.selected_rect is not rect.drawable_rect:
             self.selected_rect.is_selected = False
-        self.selected_rect = self.rect_list_widget.itemWidget(self.rect_list_widget.currentItem()).drawable_rect
-        self.image_displayer.update_scene()
+        self.selected_rect = rect.drawable_rect
+        self.image_displayer.update_rects()
 
-    def add_file(self, file: PDFFile):
+    def add_file(self, file: PDFFile, select=True):
+        # Files are plain objects stored in the item, no widget is created per file
         list_widget_item = QListWidgetItem(self.files_listwidget)
         list_widget_item.setText(str(file))
+        list_widget_item.setData(Qt.UserRole, file)
         self.files_listwidget.addItem(list_widget_item)
-        self.files_listwidget.setItemWidget(list_widget_item, file)
-        self.image_displayer.update_file(file)
-        self.files_listwidget.setCurrentItem(list_widget_item)
-
-    def selected_file(self) -> PDFFile:
-        return self.files_listwidget.itemWidget(self.files_listwidget.currentItem())
+        if select:
+            self.image_displayer.update_file(file)
+            self.files_listwidget.setCurrentItem(list_widget_item)
+
+    def add_found_files(self, batch: list):
+        select = self.files_listwidget.currentItem() is None
+        self.files_listwidget.setUpdatesEnabled(False)
+        for path, info in batch:
+            self.add_file(PDFFile(path, info), select=False)
+        self.files_listwidget.setUpdatesEnabled(True)
+
+        if select:
+            self.files_listwidget.setCurrentRow(self.files_listwidget.count() - len(batch))
+
+    def folder_loaded(self, found: int, failed: int):
+        self.load_folder_button.setText("Load folder")
+        if failed:
+            QMessageBox.warning(self, "Load folder", f"{found} PDFs loaded, {failed} files could not be read")
+
+    def selected_file(self) -> Optional[PDFFile]:
+        item = self.files_listwidget.currentItem()
+        if item is None:
+            return None
+        return item.data(Qt.UserRole)
 
     def delete_all_pdfs(self):
+        self.file_loader.cancel()
+        self.load_folder_button.setText("Load folder")
+
+        for file in self.get_files():
+            file.close()
+            self.image_displayer.loader.discard_file(file.path)
+            self.image_displayer.tiles.discard_file(file.path)
+
         for i in range(self.files_listwidget.count()):
             self.files_listwidget.takeItem(0)
 
@@ -249,6 +589,10 @@ class MainWindow(QMainWindow):
         self.image_displayer.update_scene()
 
     def delete_selected_pdf(self):
+        if self.selected_file() is not None:
+            self.selected_file().close()
+            self.image_displayer.loader.discard_file(self.selected_file().path)
+            self.image_displayer.tiles.discard_file(self.selected_file().path)
         self.files_listwidget.takeItem(self.files_listwidget.currentRow())
         self.image_displayer.update_file(None)
         self.image_displayer.update_scene()
@@ -263,42 +607,50 @@ class MainWindow(QMainWindow):
 
         self.add_file(PDFFile(file))
 
+    def load_folder(self):
+        if self.file_loader.is_loading():
+            self.file_loader.cancel()
+            self.load_folder_button.setText("Load folder")
+            return
+
+        folder = QFileDialog.getExistingDirectory(self, "Select folder with PDFs")
+        if not folder:
+            return
+
+        self.load_folder_button.setText("Stop loading")
+        self.file_loader.load_folder(Path(folder))
+
     def create_rect(self):
         if self.selected_file() is None:
             QMessageBox.critical(self, "No file selected", "Please load and select a PDF file first")
             return
 
-        rect_item = QListWidgetItem(self.rect_list_widget)
-
         name = f"{self.selected_file().file_name()}"
+        self.rect_model.add([Rect(name, self.image_displayer.current_page)])
 
-        self.rect_list_widget.addItem(rect_item)
-
-        rect = Rect(self, name, self.image_displayer.current_page)
-        rect_item.setSizeHint(rect.sizeHint())
-        self.rect_list_widget.setItemWidget(rect_item, rect)
-
-        self.image_displayer.update_scene()
+        self.image_displayer.update_rects()
 
     def rename_rect(self):
-        item = self.rect_list_widget.currentItem()
-        rect = self.rect_list_widget.itemWidget(item)
+        rect = self.current_rect()
+        if rect is None:
+            return
 
         new_name, commit = QInputDialog.getText(self, "Rename rect", "New name:", text=rect.name)
 
         if not commit:
             return
 
-        rect.label.setText(new_name)
-        rect.name = new_name
+        self.rect_model.rename(rect, new_name)
 
     def remove_rect(self):
-        item = self.rect_list_widget.currentItem()
-        if item is None:
+        rect = self.current_rect()
+        if rect is None:
             return
 
-        self.rect_list_widget.takeItem(self.rect_list_widget.row(item))
-        self.image_displayer.update_scene()
+        if self.selected_rect is not None and rect.is_selected():
+            self.selected_rect = None
+        self.rect_model.remove(self.rect_model.row(rect))
+        self.image_displayer.update_rects()
 
     def set_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select output folder")
@@ -309,16 +661,45 @@ class MainWindow(QMainWindow):
         self.output_folder_label.setText(f"Output folder: {self.output_folder.absolute()}")
 
     def extract_all(self):
-        if self.rect_list_widget.count() == 0:
+        if self.rect_model.rowCount() == 0:
             QMessageBox.critical(self, "No rects", "Please load some file and create some rects first")
             return
 
-        for i in range(self.rect_list_widget.count()):
-            rect = self.rect_list_widget.itemWidget(self.rect_list_widget.item(i))
-            self.extract(rect, info=False)
+        rects = self.rect_model.pickles()
+        paths = self.job_paths()
+        if paths is None:
+            return
+        output_folder = self.output_folder
+        profile = self.render_profile("export")
 
-        total = self.rect_list_widget.count() * self.files_listwidget.count()
-        QMessageBox.information(self, "Extraction done", f"Successfully extracted {total} rects")
+        def work(job: Job) -> tuple[int, int, list[FileFailure]]:
+            journal = Journal(output_folder)
+            try:
+                extracted = 0
+                failures = []
+                for done, path in enumerate(paths):
+                    job.check_cancelled()
+                    try:
+                        extracted += extract_document(path, rects, output_folder, journal, profile)
+                    except Exception as e:
+                        failures.append((path, str(e)))
+                    job.progress("Extracting", done + 1, len(paths))
+                return extracted, len(rects) * (len(paths) - len(failures)), failures
+            finally:
+                journal.close()
+
+        self.start_job("Extract all", work, self.extract_all_finished)
+
+    def extract_all_finished(self, result: tuple[int, int, list[FileFailure]]):
+        extracted, total, failures = result
+        message = (
+            f"Successfully extracted {extracted} rects, {total - extracted} were already up to date"
+            f"{failures_text(failures)}"
+        )
+        if failures:
+            QMessageBox.warning(self, "Extraction done", message)
+        else:
+            QMessageBox.information(self, "Extraction done", message)
 
     def extract(self, rect: Rect, info=True):
         if rect is None:
@@ -328,55 +709,84 @@ class MainWindow(QMainWindow):
         if not self.output_folder.exists():
             self.output_folder.mkdir(parents=True)
 
-        for file in self.get_files():
-            file_folder_path = self.output_folder / str(file)
-            file_output_path = file_folder_path / f"{rect.name}.png"
-            if not file_folder_path.exists():
-                file_folder_path.mkdir(parents=True)
+        pickle_rect = rect.get_pickle()
+        paths = self.job_paths()
+        if paths is None:
+            return
+        output_folder = self.output_folder
+        profile = self.render_profile("export")
 
-            rect.crop_image(file).save(str(file_output_path.absolute()))
+        def work(job: Job) -> tuple[str, list[FileFailure]]:
+            journal = Journal(output_folder)
+            failures = []
+            try:
+                for done, path in enumerate(paths):
+                    job.check_cancelled()
+                    try:
+                        extract_document(path, [pickle_rect], output_folder, journal, profile)
+                    except Exception as e:
+                        failures.append((path, str(e)))
+                    job.progress("Extracting", done + 1, len(paths))
+            finally:
+                journal.close()
+            extracted = len(paths) - len(failures)
+            return f"{pickle_rect.name}.png extracted for {extracted} files to {output_folder.absolute()}", failures
+
+        def finished(result: tuple[str, list[FileFailure]]):
+            message, failures = result
+            if failures:
+                # Shown even without info, a skipped file should not go unnoticed
+                QMessageBox.warning(self, "Extraction done", message + failures_text(failures))
+            elif info:
+                QMessageBox.information(self, "Extraction successful", message)
+
+        self.start_job(f"Extract {pickle_rect.name}", work, finished)
+
+    def current_rect(self) -> Optional[Rect]:
+        return self.rect_model.rect(self.rect_list_view.currentIndex())
+
+    def show_rect_context_menu(self, pos: QPoint):
+        index = self.rect_list_view.indexAt(pos)
+        if not index.isValid():
+            return
+        self.rect_list_view.setCurrentIndex(index)
+        rect = self.rect_model.rect(index)
 
-            if info:
-                QMessageBox.information(
-                    self, "Extraction successful", f"Image extracted to {file_output_path.absolute()}"
-                )
+        menu = QMenu()
+        menu.addAction("Rename", self.rename_rect)
+        menu.addAction("Remove", self.remove_rect)
+        preprocess_action = menu.addAction("Preprocess for OCR", rect.toggle_preprocess)
+        preprocess_action.setCheckable(True)
+        preprocess_action.setChecked(rect.preprocess)
+        menu.exec(self.rect_list_view.viewport().mapToGlobal(pos))
 
     def get_files(self) -> list[PDFFile]:
-        return [
-            self.files_listwidget.itemWidget(self.files_listwidget.item(i))
-            for i in range(self.files_listwidget.count())
-        ]
+        return [self.files_listwidget.item(i).data(Qt.UserRole) for i in range(self.files_listwidget.count())]
 
     def delete_all_rects(self):
-        if self.rect_list_widget.count() == 0:
+        if self.rect_model.rowCount() == 0:
             return
 
-        for i in range(self.rect_list_widget.count()):
-            self.rect_list_widget.takeItem(0)
-
-        self.rect_list_widget.clear()
-        self.image_displayer.update_scene()
+        self.selected_rect = None
+        self.rect_model.clear()
+        self.image_displayer.update_rects()
 
     def save_rects(self):
-        if self.rect_list_widget.count() == 0:
+        if self.rect_model.rowCount() == 0:
             QMessageBox.critical(self, "No rects", "There are no rects to save")
             return
 
-        rects = []
-        for i in range(self.rect_list_widget.count()):
-            rect = self.rect_list_widget.itemWidget(self.rect_list_widget.item(i))
-            rects.append(rect.get_pickle())
+        rects = self.rect_model.pickles()
 
         path, commit = QFileDialog.getSaveFileName(self, "Save rects", "", "Rects (*.rects)")
         if not commit:
             return
 
-        with open(path, "wb") as f:
-            pickle.dump(rects, f)
+        save_rects(path, rects, self.template_render)
         QMessageBox.information(self, "Save successful", f"{len(rects)} rects saved successfully")
 
     def load_rects(self):
-        if self.rect_list_widget.count() != 0:
+        if self.rect_model.rowCount() != 0:
             question = QMessageBox.question(self, "Load rects", "This will delete all the current rects, are you sure?")
             if question == QMessageBox.No:
                 return
@@ -385,18 +795,17 @@ class MainWindow(QMainWindow):
         if not commit:
             return
 
-        with open(path, "rb") as f:
-            l = pickle.load(f)
+        try:
+            template = load_template(path)
+        except (ValueError, KeyError, TypeError, pickle.UnpicklingError) as e:
+            QMessageBox.critical(self, "Load rects", f"Could not read {path}:\n{e}")
+            return
 
         self.delete_all_rects()
 
-        for rect in l:
-            rect_item = QListWidgetItem(self.rect_list_widget)
-            self.rect_list_widget.addItem(rect_item)
-            pickle_rect = PickleRect(rect.x, rect.y, rect.width, rect.height, rect.name, rect.page)
-            rect = Rect.from_pickle(self, pickle_rect)
-            rect_item.setSizeHint(rect.sizeHint())
-            self.rect_list_widget.setItemWidget(rect_item, rect)
+        # One model insert, graphics items are only created for the rects that get shown
+        self.rect_model.add_pickles(template.rects)
+        self.template_render = template.render
 
         if self.image_displayer.file is not None:
-            self.image_displayer.update_scene()
+            self.image_displayer.update_rects()
@@ -0,0 +1,55 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+CELL_SIZE = 128  # Pixels, a few words per cell at OCR resolutions
+
+
+@dataclass
+class Word:
+    box: tuple[int, int, int, int]  # left, top, right, bottom
+    text: str
+    line: int  # Words of the same line share it, lines are numbered in reading order
+
+    def center(self) -> tuple[float, float]:
+        left, top, right, bottom = self.box
+        return (left + right) / 2, (top + bottom) / 2
+
+
+class WordIndex:
+    # Uniform grid over the word centres, a rect only looks at the cells it overlaps
+    def __init__(self, words: list[Word], cell_size: int = CELL_SIZE):
+        self.words = words
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        for i, word in enumerate(words):
+            x, y = word.center()
+            self.cells[int(x // cell_size), int(y // cell_size)].append(i)
+
+    def query(self, box: tuple[int, int, int, int]) -> list[Word]:
+        left, top, right, bottom = box
+        found = []
+        for column in range(int(left // self.cell_size), int(right // self.cell_size) + 1):
+            for row in range(int(top // self.cell_size), int(bottom // self.cell_size) + 1):
+                for i in self.cells.get((column, row), ()):
+                    x, y = self.words[i].center()
+                    if left <= x < right and top <= y < bottom:
+                        found.append(i)
+        # Back in the order tesseract read them
+        return [self.words[i] for i in sorted(found)]
+
+
+def words_text(words: list[Word]) -> str:
+    lines: list[list[str]] = []
+    last_line = None
+    for word in words:
+        if word.line != last_line:
+            lines.append([])
+            last_line = word.line
+        lines[-1].append(word.text)
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def assign_words(words: list[Word], boxes: list[tuple[int, int, int, int]]) -> list[str]:
+    # A word belongs to the rect its centre falls in
+    index = WordIndex(words)
+    return [words_text(index.query(box)) for box in boxes]